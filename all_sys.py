@@ -1,4 +1,13 @@
+import atexit
+import copy
+import hashlib
 import math
+import struct
+import sys
+import time
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from itertools import combinations
 import json # Ensure json is imported for the final output
 import numpy as np # Global import for GBR engine
@@ -41,6 +50,34 @@ UNIT_PRICE_TABLE = {
     }
 }
 
+# V3.4: 组合搜索的容量/功率可行性判断使用定点整数：直流容量以 Wh、功率以 W 为单位，
+# 候选方案的容量/功率以 kWh/kW 整数保存（即原先 round(..., 3) 的结果），对外返回值仍换算回浮点数（MWh/MW）。
+# 定点只用于与项目约束的比较（容量/功率/实际功率是否达到需求），这些比较不再受累加顺序和浮点误差影响；
+# 例外是取整恰为 .5 kWh/kW 时（如实际功率 7.522MWh ÷ 4h = 1.8805MW），原浮点累加误差决定取整方向，_round_fixed 改用原浮点累加值取整以保持结果不变。
+# 成本、平衡阈值及成本相近窗口仍为浮点：原规则按 round(等效容量 × 100 × 单价, 2) 及 ±平衡阈值/EPSILON 比较，
+# 改为整数（分）会在浮点误差恰好跨过比较边界时改变当前最优的选择，因此不做定点化
+CAPACITY_FIXED_SCALE = 1000000  # Wh / MWh
+POWER_FIXED_SCALE = 1000000  # W / MW
+ROUNDED_FIXED_SCALE = 1000  # kWh / MWh，kW / MW
+
+def _to_fixed(value, scale):
+    """浮点数按比例转换为定点整数（取最近的定点网格值）"""
+    return round(value * scale)
+
+def _round_fixed(total, unit, float_value):
+    """
+    非负定点整数 total 按 unit 四舍五入取整。恰为 .5 时浮点 round 的结果取决于累加误差，
+    此时改用 float_value() 给出的原浮点累加值，按 round(..., 3) 取整，与原浮点算法完全一致
+    """
+    quotient, remainder = divmod(total, unit)
+    if 2 * remainder == unit:
+        return round(round(float_value(), 3) * ROUNDED_FIXED_SCALE)
+    return quotient + (2 * remainder > unit)
+
+def _fixed_need(value, scale):
+    """满足 定点值 / scale ≥ value - EPSILON 的最小定点整数（项目约束换算为整数下限）"""
+    return math.ceil(value * scale - EPSILON * scale)
+
 def get_dc_spec_by_name(name):
     return DC_CONTAINER_SPECS[name]
 
@@ -115,8 +152,8 @@ def generate_single_ess_block_configs(global_dc_spec_names, system_hour_type, pr
             max_n_dc_on_pcs = 4  # 6h系统的5MW PCS限制为4个电池舱
             
             # 按照常规逻辑配置电池舱，但只使用5MW PCS
+            valid_global_dc_names_for_current_family = [name for name in global_dc_spec_names if get_dc_spec_by_name(name)["family"] == target_dc_family_filter]
             for n_dc_on_pcs in range(1, max_n_dc_on_pcs + 1):
-                valid_global_dc_names_for_current_family = [name for name in global_dc_spec_names if get_dc_spec_by_name(name)["family"] == target_dc_family_filter]
                 if not valid_global_dc_names_for_current_family: continue
                 
                 dc_container_combinations_for_n = []
@@ -226,6 +263,7 @@ def generate_single_ess_block_configs(global_dc_spec_names, system_hour_type, pr
     
     # 其他系统时长的原有逻辑完全保持不变
     # 按照常规逻辑处理所有系统时长类型
+    valid_global_dc_names_for_current_family = [name for name in global_dc_spec_names if get_dc_spec_by_name(name)["family"] == target_dc_family_filter]
     for pcs_name, pcs_spec in PCS_SPECS.items():
         pcs_power = pcs_spec["power_mw"]; pcs_cost = pcs_spec["cost_eq_mwh"]; max_n_dc_on_pcs = system_hour_type 
         initial_compatibility = False
@@ -235,7 +273,6 @@ def generate_single_ess_block_configs(global_dc_spec_names, system_hour_type, pr
             if target_dc_family_filter == "7.5MW": initial_compatibility = True
         if not initial_compatibility: continue
         for n_dc_on_pcs in range(1, max_n_dc_on_pcs + 1):
-            valid_global_dc_names_for_current_family = [name for name in global_dc_spec_names if get_dc_spec_by_name(name)["family"] == target_dc_family_filter]
             if not valid_global_dc_names_for_current_family: continue
             dc_container_combinations_for_n = []
             if len(valid_global_dc_names_for_current_family) == 1:
@@ -336,34 +373,880 @@ def generate_single_ess_block_configs(global_dc_spec_names, system_hour_type, pr
     
     return ess_blocks
 
-def find_best_combination_of_ess_blocks(project_power_mw, project_capacity_mwh, available_ess_blocks, system_hour_type, target_dc_family, max_device_sets=100):
-    # V3.0: 获取单价
-    unit_price = get_unit_price(system_hour_type, target_dc_family)
-    if unit_price is None:
-        # 如果没有定义单价，返回错误
-        return {
-            "cost": float('inf'), "power": 0, "capacity": 0, "blocks_config": [], 
-            "block_details_for_message": [], "block_details_for_display": [], 
-            "user_limit_warning": f"系统时长类型{system_hour_type}h和DC家族{target_dc_family}的单价未定义", 
-            "total_dc_containers_calc": float('inf')
-        }
-    
-    best_solution = {
-        "cost": float('inf'), "power": 0, "capacity": 0, "blocks_config": [], 
-        "block_details_for_message": [], "block_details_for_display": [], "user_limit_warning": "", "total_dc_containers_calc": float('inf')
-    }
-    if abs(project_power_mw) < EPSILON and abs(project_capacity_mwh) < EPSILON: 
-        best_solution["cost"] = 0; best_solution["total_dc_containers_calc"] = 0; return best_solution
-    if not available_ess_blocks: return best_solution
-    
+# V3.3: 单元块目录缓存
+# 单元块只取决于 (全局DC规格集合, 系统时长类型, DC家族)，与项目功率/容量无关，首次使用时生成并缓存。
+# 缓存中的块列表为元组，块字典在各次求解间共享，调用方不得修改。
+# 目录由 ConfiguratorEngine 持有（模块级函数使用默认引擎的目录）。
+ESS_BLOCK_CATALOGUE_VERSION = 1
+
+def _ess_block_catalogue_key(global_dc_spec_names, system_hour_type, target_dc_family_filter):
+    return (tuple(sorted(global_dc_spec_names)), system_hour_type, target_dc_family_filter)
+
+def get_ess_block_catalogue(global_dc_spec_names, system_hour_type, target_dc_family_filter):
+    """返回 (全局DC规格集合, 系统时长类型, DC家族) 对应的单元块元组（带缓存）"""
+    return default_engine().ess_block_catalogue(global_dc_spec_names, system_hour_type, target_dc_family_filter)
+
+def _ess_block_catalogue_specs():
+    """目录所依赖的设备规格，导入预生成目录时用于校验"""
+    return {"dc_container_specs": DC_CONTAINER_SPECS, "pcs_specs": PCS_SPECS}
+
+def export_ess_block_catalogue(system_hour_types=(2, 4, 6)):
+    """
+    生成全部 (DC家族, 系统时长类型, 全局DC规格选择) 的单元块目录，并导出为 JSON 文本，
+    供浏览器端预先加载（load_ess_block_catalogue），跳过单元块生成步骤
+    """
+    entries = []
+    for target_dc_family in sorted(set(spec["family"] for spec in DC_CONTAINER_SPECS.values())):
+        dc_specs_for_family = [name for name, spec in DC_CONTAINER_SPECS.items() if spec["family"] == target_dc_family]
+        global_dc_choices = [[name] for name in dc_specs_for_family] + [list(c) for c in combinations(dc_specs_for_family, 2)]
+        for system_hour_type in system_hour_types:
+            for global_dc_names in global_dc_choices:
+                entries.append({
+                    "dc_specs": sorted(global_dc_names), "system_hour_type": system_hour_type, "dc_family": target_dc_family,
+                    "blocks": list(get_ess_block_catalogue(global_dc_names, system_hour_type, target_dc_family))
+                })
+    return json.dumps({"version": ESS_BLOCK_CATALOGUE_VERSION, "specs": _ess_block_catalogue_specs(), "entries": entries}, ensure_ascii=False)
+
+def load_ess_block_catalogue(catalogue_json):
+    """导入 export_ess_block_catalogue 生成的目录，返回导入的条目数；版本或设备规格不一致时抛出 ValueError"""
+    data = json.loads(catalogue_json)
+    if data.get("version") != ESS_BLOCK_CATALOGUE_VERSION or data.get("specs") != json.loads(json.dumps(_ess_block_catalogue_specs())):
+        raise ValueError("单元块目录与当前版本的设备规格不一致，请重新生成")
+    catalogue = default_engine().block_catalogue
+    for entry in data["entries"]:
+        key = _ess_block_catalogue_key(entry["dc_specs"], entry["system_hour_type"], entry["dc_family"])
+        catalogue[key] = tuple(entry["blocks"])
+    return len(data["entries"])
+
+# V3.3: 组合搜索引擎（可插拔）
+# "exact"     : 按单元块类型子集做分支定界，精确求解
+# "enumerate" : 按原 S1/S2/S3 遍历顺序逐场景提交候选（S2/S3 的拆分按闭式区间求解而非逐点枚举，且不设 s3_max_sets 上限），
+#               不按类型子集做分支定界，作结构更简单的对照引擎
+DEFAULT_SEARCH_ENGINE = "exact"
+MAX_BLOCK_TYPES_PER_SOLUTION = 3  # 单个方案中允许的ESS单元块类型数上限
+
+class _CandidatePool:
+    """
+    候选方案池：按原 S1/S2/S3 遍历顺序逐个接收可行候选，按原逐个比较的规则更新当前最优方案：
+    成本低于当前最优超过平衡阈值时替换；成本在平衡阈值内时，电池舱总数更少、或电池舱总数相同且成本更低、
+    或成本相同且额定功率更低时替换。该规则与遍历顺序有关，各搜索引擎都必须按原遍历顺序提交候选。
+    成本超过 当前最优成本 + 平衡阈值 的候选必然被拒绝，各引擎据此跳过（不改变当前最优，跳过后阈值不变）。
+    该规则不具传递性：即使某单元块在各比较字段上都不优于遍历中更早的单元块，含它的候选仍可能在之后替换当前最优，
+    因此不预先剔除被支配的单元块。
+    候选以扁平元组 (电池舱总数, 成本, 额定功率, 总块数, 类型数, 块索引, 块数量, 直流容量) 存放，
+    blocks_config 仅在搜索结束后为最优候选生成一次。
+    """
+    def __init__(self, cost_tie_epsilon):
+        self.cost_tie_epsilon = cost_tie_epsilon
+        self.min_cost = float('inf')  # 接受过的候选的最低成本（最优成本下界用）
+        self.incumbent = None
+
+    def threshold(self):
+        """仍可能替换当前最优的最高成本"""
+        if self.incumbent is None:
+            return float('inf')
+        return self.incumbent[1] + self.cost_tie_epsilon
+
+    def offer(self, entry):
+        """按原规则比较，替换当前最优时返回 True"""
+        best = self.incumbent
+        if best is not None:
+            total_dc_containers, cost, power = entry[:3]
+            best_dc_containers, best_cost, best_power = best[:3]
+            if cost < best_cost - self.cost_tie_epsilon: pass
+            elif cost > best_cost + self.cost_tie_epsilon: return False
+            elif total_dc_containers < best_dc_containers: pass
+            elif total_dc_containers > best_dc_containers: return False
+            elif cost < best_cost - EPSILON: pass
+            elif not (abs(cost - best_cost) < EPSILON and power < best_power): return False
+        self.incumbent = entry
+        self.min_cost = min(self.min_cost, entry[1])
+        return True
+
+    def best(self):
+        return self.incumbent
+
+    def for_types(self, types):
+        """单元块类型子集对应的候选池（单一候选池时即自身）"""
+        return self
+
+    def type_subsets(self, n_blocks, k):
+        """按字典序列出需要搜索的 k 类单元块子集"""
+        return combinations(range(n_blocks), k)
+
+class _SharedCandidatePools:
+    """
+    多个全局DC规格选择共用一次组合搜索：每个选择一个候选池，联合单元块表中每块带有可用选择的位掩码，
+    候选组合只提交给其全部单元块都可用、且总块数未超出该选择循环上限的选择；各选择的候选按其自身的遍历顺序到达，
+    逐个比较的结果与单独求解相同。
+    当前最优可能随后续候选上升（电池舱更少、成本略高的候选仍可替换；在此之前还可能先被电池舱更多、成本低出平衡阈值以上的候选替换，
+    上升次数不受电池舱数差的限制），搜索中途无法由当前最优给出最终成本的上界；
+    因此只用已求解完毕的选择的成本（见 mark_finished、exclude_above）剔除成本下界超出最终排序窗口的选择。
+    """
+    def __init__(self, pools, loop_ends, block_masks, cost_similarity_threshold, cost_lower_bounds, min_block_costs):
+        self.pools = pools
+        self.loop_ends = loop_ends
+        self.block_masks = block_masks
+        self.cost_tie_epsilon = pools[0].cost_tie_epsilon
+        self.cost_similarity_threshold = cost_similarity_threshold
+        self.cost_lower_bounds = cost_lower_bounds
+        self.min_block_costs = min_block_costs
+        self.live = [True] * len(pools)
+        self.finished = [False] * len(pools)
+        self.version = 0
+        self._threshold = float('inf')
+        self._views = {}
+        self.ctx = None  # 本部分的搜索上下文（收集备选方案时计算实际功率、生成配置用）
+        self.alternatives = None  # _AlternativeCollector（整个DC家族共用），None 为不收集备选方案
+
+    def threshold(self):
+        """所有选择中仍可能进入窗口（或进入备选方案）的最高成本"""
+        return self._threshold
+
+    def for_types(self, types):
+        """单元块类型子集对应的候选池视图；没有任何选择同时包含这些单元块时返回 None"""
+        if types in self._views:
+            return self._views[types]
+        mask = -1
+        for i in types:
+            mask &= self.block_masks[i]
+        members = tuple(c for c in range(len(self.pools)) if mask >> c & 1)
+        view = _CandidatePoolView(self, members) if members else None
+        self._views[types] = view
+        return view
+
+    def type_subsets(self, n_blocks, k):
+        """按字典序列出至少一个选择同时包含的 k 类单元块子集（按位掩码逐层剪枝）"""
+        def extend(prefix, start, mask):
+            if len(prefix) == k:
+                yield prefix
+                return
+            for i in range(start, n_blocks - (k - len(prefix)) + 1):
+                next_mask = mask & self.block_masks[i]
+                if next_mask:
+                    yield from extend(prefix + (i,), i + 1, next_mask)
+        return extend((), 0, -1)
+
+    def mark_finished(self, num_total_sel_blocks):
+        """
+        总块数 num_total_sel_blocks 搜索完毕后标记已求解完毕的选择：已到循环上限，或更大总块数的成本下界已超过其候选池阈值
+        （之后的候选必然被拒绝，阈值不再变化，当前最优即最终结果）
+        """
+        for c, pool in enumerate(self.pools):
+            if not self.finished[c] and (num_total_sel_blocks >= self.loop_ends[c]
+                                         or (num_total_sel_blocks + 1) * self.min_block_costs[c] - 0.01 > pool.threshold()):
+                self.finished[c] = True
+
+    def finished_min_cost(self):
+        """已求解完毕的选择的最低成本"""
+        return min((pool.best()[1] for pool, finished in zip(self.pools, self.finished) if finished and pool.best() is not None), default=float('inf'))
+
+    def exclude_above(self, finished_cost):
+        """已求解完毕的选择的最低成本为 finished_cost：成本下界超过 finished_cost + 成本相似阈值 的选择不可能进入最终排序窗口，不再搜索"""
+        live = self.live
+        self.live = [live and (finished or lower <= finished_cost + self.cost_similarity_threshold + EPSILON)
+                     for live, finished, lower in zip(self.live, self.finished, self.cost_lower_bounds)]
+        if live != self.live:
+            self.refresh()
+
+    def refresh(self):
+        self.version += 1
+        self._threshold = max((p.threshold() for p, live in zip(self.pools, self.live) if live), default=-float('inf'))
+        if self.alternatives is not None:
+            self._threshold = max(self._threshold, self.alternatives.threshold())
+
+class _CandidatePoolView:
+    """_SharedCandidatePools 中若干选择的候选池视图，接口与 _CandidatePool 相同"""
+    __slots__ = ("shared", "members", "cost_tie_epsilon", "_version", "_threshold")
+
+    def __init__(self, shared, members):
+        self.shared = shared
+        self.members = members
+        self.cost_tie_epsilon = shared.cost_tie_epsilon
+        self._version = -1
+        self._threshold = float('inf')
+
+    def threshold(self):
+        shared = self.shared
+        if self._version != shared.version:
+            self._version = shared.version
+            self._threshold = max((shared.pools[c].threshold() for c in self.members if shared.live[c]), default=-float('inf'))
+            if shared.alternatives is not None:
+                self._threshold = max(self._threshold, shared.alternatives.threshold())
+        return self._threshold
+
+    def offer(self, entry):
+        shared = self.shared
+        collected = False
+        choices = [c for c in self.members if entry[3] <= shared.loop_ends[c]] if shared.alternatives is not None else None
+        if choices:
+            collected = shared.alternatives.offer(entry, shared.ctx, choices)
+            if collected:
+                shared.refresh()
+        accepted = False
+        for c in self.members:
+            if not shared.live[c] or entry[3] > shared.loop_ends[c]: continue
+            accepted = shared.pools[c].offer(entry) or accepted
+        if accepted:
+            shared.refresh()
+        return accepted or collected
+
+def _alternatives_spec(alternatives):
+    """
+    备选方案参数规范化为 (top_k, pareto)，不收集时为 None。
+    alternatives: None / 0 不收集；正整数 K 为成本最低的 K 个配置；"pareto" 为帕累托前沿；{"top_k": K, "pareto": True} 为两者
+    """
+    if not alternatives:
+        return None
+    if alternatives == "pareto":
+        return (0, True)
+    if isinstance(alternatives, dict):
+        spec = (int(alternatives.get("top_k", 0)), bool(alternatives.get("pareto", False)))
+    elif isinstance(alternatives, int) and not isinstance(alternatives, bool):
+        spec = (alternatives, False)
+    else:
+        raise ValueError(f"无效的备选方案参数: {alternatives!r}")
+    if spec[0] < 0:
+        raise ValueError(f"无效的备选方案参数: {alternatives!r}")
+    return spec if spec[0] or spec[1] else None
+
+class _AlternativeCollector:
+    """
+    搜索中顺带收集备选方案（整个DC家族的各共享搜索部分共用一个）：
+    top_k > 0 时保留成本最低的 top_k 个不同配置（按 成本 -> 电池舱总数 -> 额定功率 排序）；
+    pareto 为 True 时维护成本相似窗口（最低成本 + 成本相似阈值）内 (成本, 电池舱总数, 额定功率, 实际功率) 的帕累托前沿，
+    成本、电池舱总数越低越好，额定/实际功率越高越好。
+    threshold() 为仍可能进入备选的最高成本，搜索剪枝阈值不低于它，因此一次搜索即可得到完整的备选集合。
+    """
+    def __init__(self, top_k, pareto, cost_similarity_threshold):
+        self.top_k = top_k
+        self.pareto = pareto
+        self.cost_similarity_threshold = cost_similarity_threshold
+        self.min_cost = float('inf')
+        self.top = []  # [(排序键, 条目, (搜索上下文, 选择)), ...]，按排序键升序，最多 top_k 项
+        self.front = []  # [((目标向量, 配置), 条目, (搜索上下文, 选择)), ...]
+        self._seen = set()
+
+    def threshold(self):
+        top_threshold = (self.top[-1][0][0] if len(self.top) >= self.top_k else float('inf')) if self.top_k else -float('inf')
+        pareto_threshold = self.min_cost + self.cost_similarity_threshold + EPSILON if self.pareto else -float('inf')
+        return max(top_threshold, pareto_threshold)
+
+    def offer(self, entry, ctx, choices=(None,)):
+        """
+        收集一个可行候选，备选集合变化时返回 True。
+        搜索在单元块等价类上进行时，同一候选在 choices 中各选择下展开为（可能不同的）具体配置，逐个收集
+        """
+        changed = False
+        for choice in choices:
+            changed = self._offer_config(entry, ctx, choice) or changed
+        return changed
+
+    def _offer_config(self, entry, ctx, choice):
+        total_dc_containers, cost, power, _, _, indices, counts, _ = entry
+        if cost > self.threshold():
+            return False
+        # 同一配置可能出现在多个共享搜索部分（联合单元块表不同），按块描述去重
+        identity = tuple((block["block_description"], n) for n, block in ctx.build_blocks_config(zip(indices, counts), choice))
+        if identity in self._seen:
+            return False
+        self._seen.add(identity)
+        changed = False
+        if self.top_k:
+            key = (cost, total_dc_containers, power, identity)
+            if len(self.top) < self.top_k or key < self.top[-1][0]:
+                self.top.append((key, entry, (ctx, choice)))
+                self.top.sort(key=lambda item: item[0])
+                del self.top[self.top_k:]
+                changed = True
+        if self.pareto:
+            objectives = (cost, total_dc_containers, -power, -ctx.actual_power_of(zip(indices, counts)))
+            if not any(_dominates(other[0], objectives) for other, _, _ in self.front):
+                self.front = [item for item in self.front if not _dominates(objectives, item[0][0])]
+                self.front.append(((objectives, identity), entry, (ctx, choice)))
+                changed = True
+            if cost < self.min_cost:
+                self.min_cost = cost
+                changed = True
+        return changed
+
+    def results(self, target_dc_family):
+        """{"top_k": [...], "pareto_front": [...]}（按规格给出其中之一或两者），各项为备选方案字典（见 _alternative_solution）"""
+        results = {}
+        if self.top_k:
+            results["top_k"] = [_alternative_solution(*source, entry, target_dc_family) for _, entry, source in self.top]
+        if self.pareto:
+            window = self.min_cost + self.cost_similarity_threshold + EPSILON
+            front = sorted((item for item in self.front if item[0][0][0] <= window), key=lambda item: item[0])
+            results["pareto_front"] = [_alternative_solution(*source, entry, target_dc_family) for _, entry, source in front]
+        return results
+
+def _dominates(a, b):
+    """目标向量 a 是否帕累托支配 b（各分量越小越好）"""
+    return a != b and all(x <= y for x, y in zip(a, b))
+
+def _alternative_solution(ctx, choice, entry, target_dc_family):
+    """由候选条目生成备选方案字典：成本、电池舱总数、额定/实际功率、直流容量、所用电池舱规格及单元块明细（choice 见 build_blocks_config）"""
+    total_dc_containers, cost, power, _, _, indices, counts, capacity = entry
+    combo = tuple(zip(indices, counts))
+    power, capacity = power / ROUNDED_FIXED_SCALE, capacity / ROUNDED_FIXED_SCALE
+    solution = _finish_best_solution({"cost": cost, "power": power, "capacity": capacity, "blocks_config": ctx.build_blocks_config(combo, choice)})
+    dc_names = sorted({dc["name"] for _, block in solution["blocks_config"] for dc in block.get("dc_containers_detail_list", [])})
+    solution.update({"total_cost": cost, "total_dc_containers": total_dc_containers, "actual_power": ctx.actual_power_of(combo) / ROUNDED_FIXED_SCALE,
+                     "equivalent_capacity": round(sum(n * ctx.equivalent[i] for i, n in combo), 3),
+                     "chosen_global_dc_specs": [DC_CONTAINER_SPECS[name].get("name_cn", name) for name in dc_names],
+                     "dc_family_technology": target_dc_family})
+    return solution
+
+def _merge_alternatives(alternatives_list):
+    """合并多个DC家族的备选方案：top_k 按 成本 -> 电池舱总数 -> 额定功率 取前 K 个，pareto_front 重新取前沿"""
+    merged = {}
+    top_lists = [alternatives["top_k"] for alternatives in alternatives_list if "top_k" in alternatives]
+    if top_lists:
+        merged["top_k"] = sorted((a for top in top_lists for a in top), key=lambda a: (a["cost"], a["total_dc_containers"], a["power"]))[:max(map(len, top_lists))]
+    fronts = [alternatives["pareto_front"] for alternatives in alternatives_list if "pareto_front" in alternatives]
+    if fronts:
+        objectives = lambda a: (a["cost"], a["total_dc_containers"], -a["power"], -a["actual_power"])
+        candidates = [a for front in fronts for a in front]
+        merged["pareto_front"] = sorted((a for a in candidates if not any(_dominates(objectives(b), objectives(a)) for b in candidates)), key=objectives)
+    return merged
+
+class EssBlockTable:
+    """
+    ESS单元块的列式表（struct-of-arrays），块ID即列下标。
+    组合搜索只按块ID读取各列，完整的块字典仅在生成最终 blocks_config 时使用。
+    """
+    __slots__ = ("blocks", "unit_price", "power", "capacity", "equivalent", "block_cost", "actual_power",
+                 "power_fixed", "capacity_fixed", "actual_power_fixed", "actual_power_fixed_per_kw",
+                 "has_reduced", "dc_count", "description_rank", "description_id", "_aggregates_cache")
+
+    def __init__(self, available_ess_blocks, system_hour_type, unit_price):
+        self.blocks = tuple(available_ess_blocks)
+        self.unit_price = unit_price
+        self.power = tuple(b["pcs_power_mw"] for b in self.blocks)
+        self.capacity = tuple(b["block_dc_capacity_mwh"] for b in self.blocks)
+        self.equivalent = tuple(b["block_equivalent_capacity_mwh"] for b in self.blocks)
+        # 单块成本（万元）= 等效容量 × 100 × 单价，供成本下界使用；
+        # 组合成本仍按 round(Σ数量×等效容量 × 100 × 单价, 2) 计算（见 _BlockSearchContext.cost_of），逐块成本求和的浮点舍入与之不同
+        self.block_cost = tuple(e * 100 * unit_price for e in self.equivalent)
+        # 统一公式：min(PCS额定功率, 直流容量÷系统时长)
+        if system_hour_type > EPSILON:
+            self.actual_power = tuple(min(p, c / system_hour_type) for p, c in zip(self.power, self.capacity))
+        else:
+            self.actual_power = self.power
+        # 定点列（见 CAPACITY_FIXED_SCALE 等）：候选组合的容量/功率可行性判断为精确整数运算
+        self.power_fixed = tuple(_to_fixed(p, POWER_FIXED_SCALE) for p in self.power)
+        self.capacity_fixed = tuple(_to_fixed(c, CAPACITY_FIXED_SCALE) for c in self.capacity)
+        # 实际功率以 1/h W 为单位：min(额定功率W × h, 直流容量Wh)，h 为系统时长（整数小时）
+        hours = _to_fixed(system_hour_type, 1) if system_hour_type > EPSILON else 1
+        if system_hour_type > EPSILON:
+            self.actual_power_fixed = tuple(min(p * hours, c) for p, c in zip(self.power_fixed, self.capacity_fixed))
+        else:
+            self.actual_power_fixed = self.power_fixed
+        self.actual_power_fixed_per_kw = POWER_FIXED_SCALE // ROUNDED_FIXED_SCALE * hours
+        self.has_reduced = tuple(
+            any(get_dc_spec_by_name(d["name"])["reduced_clusters"] > 0 for d in b.get("dc_containers_detail_list", []))
+            for b in self.blocks
+        )
+        self.dc_count = tuple(get_total_physical_dc_containers_count([(1, b)]) for b in self.blocks)
+        # 按块描述排序的名次（稳定排序，与原 sorted(..., key=block_description) 一致）及描述去重ID
+        descriptions = [b["block_description"] for b in self.blocks]
+        rank = [0] * len(descriptions)
+        for r, i in enumerate(sorted(range(len(descriptions)), key=lambda i: descriptions[i])):
+            rank[i] = r
+        self.description_rank = tuple(rank)
+        first_seen = {}
+        self.description_id = tuple(first_seen.setdefault(d, i) for i, d in enumerate(descriptions))
+        self._aggregates_cache = {}
+
+    def __len__(self):
+        return len(self.blocks)
+
+    def type_aggregates(self, types):
+        """单元块类型组合的汇总参数（缓存在表上，复用同一张表的各次求解共享），供分支定界计算上下界"""
+        aggregates = self._aggregates_cache.get(types)
+        if aggregates is None:
+            ratios = [self.equivalent[i] / self.capacity[i] for i in types if self.capacity[i] > EPSILON]
+            aggregates = (
+                sum(self.equivalent[i] for i in types), min(self.equivalent[i] for i in types),
+                min(ratios) if ratios else 0.0,
+                sum(self.capacity[i] for i in types), max(self.capacity[i] for i in types),
+                sum(self.power[i] for i in types), max(self.power[i] for i in types),
+                sum(self.actual_power[i] for i in types), max(self.actual_power[i] for i in types),
+            )
+            self._aggregates_cache[types] = aggregates
+        return aggregates
+
+    def relaxed_minimum(self, weights, project_power_mw, project_capacity_mwh, types=None, power_values=None):
+        """
+        线性松弛下界：min Σ w·x，s.t. Σ 直流容量·x ≥ 项目容量，Σ 功率·x ≥ 项目功率，x ≥ 0。
+        types 限定可用的块ID（默认全部）；power_values 默认取额定功率（实际功率不超过额定功率，仍是松弛）。
+        两个约束的线性规划最优顶点至多含两个非零变量，枚举单块及块对的顶点即可。
+        """
+        capacity_needed = max(project_capacity_mwh - EPSILON - 0.001, 0.0)
+        power_needed = max(project_power_mw - EPSILON - 0.001, 0.0)
+        types = range(len(self.blocks)) if types is None else types
+        power_values = self.power if power_values is None else power_values
+        best = float('inf')
+        for pos, i in enumerate(types):
+            c_i, p_i = self.capacity[i], power_values[i]
+            if (capacity_needed <= 0 or c_i > EPSILON) and (power_needed <= 0 or p_i > EPSILON):
+                x = max(capacity_needed / c_i if capacity_needed > 0 else 0.0, power_needed / p_i if power_needed > 0 else 0.0)
+                best = min(best, weights[i] * x)
+            for j in types[pos + 1:]:
+                c_j, p_j = self.capacity[j], power_values[j]
+                det = c_i * p_j - c_j * p_i
+                if abs(det) <= EPSILON: continue
+                x = (capacity_needed * p_j - c_j * power_needed) / det
+                y = (c_i * power_needed - capacity_needed * p_i) / det
+                if x >= 0 and y >= 0:
+                    best = min(best, weights[i] * x + weights[j] * y)
+        return best
+
+    def lower_bounds(self, project_power_mw, project_capacity_mwh):
+        """满足项目约束的任意组合的 (成本下界(万元), 电池舱总数下界)"""
+        relaxed_cost = self.relaxed_minimum(self.block_cost, project_power_mw, project_capacity_mwh)
+        relaxed_dc_count = self.relaxed_minimum(self.dc_count, project_power_mw, project_capacity_mwh)
+        cost_lower = relaxed_cost * (1 - 1e-9) - 0.01
+        dc_lower = math.ceil(relaxed_dc_count - 1e-6) if relaxed_dc_count < float('inf') else relaxed_dc_count
+        return cost_lower, dc_lower
+
+class _SearchInterrupted(Exception):
+    """搜索在检查点被中止（超出时间预算），候选池中保留已找到的最优候选"""
+
+class SolveCancelled(Exception):
+    """求解被取消（CancellationToken.cancel() 或 Pyodide 中断缓冲区），不返回任何方案"""
+
+class CancellationToken:
+    """协作式取消令牌：搜索引擎在检查点调用 raise_if_cancelled()，cancel() 可由其他线程调用"""
+    def __init__(self):
+        self._cancelled = False
+
+    def cancel(self):
+        self._cancelled = True
+
+    @property
+    def cancelled(self):
+        return self._cancelled
+
+    def raise_if_cancelled(self):
+        if self._cancelled:
+            raise SolveCancelled("求解已取消")
+
+class PyodideInterruptToken(CancellationToken):
+    """
+    Pyodide（Web Worker）中的取消令牌：由 pyodide.setInterruptBuffer() 注册的中断缓冲区驱动，
+    主线程向缓冲区写入 2 即取消当前求解。检查通过 pyodide.checkInterrupt() 完成，
+    两次检查至少间隔 check_interval_ms，避免每个检查点都调用 JS。
+    """
+    def __init__(self, check_interval_ms=2):
+        super().__init__()
+        import pyodide_js  # 仅在 Pyodide 中可用
+        self._check_interrupt = pyodide_js.checkInterrupt
+        self.check_interval = check_interval_ms / 1000.0
+        self._next_check = 0.0
+
+    def raise_if_cancelled(self):
+        now = time.perf_counter()
+        if not self._cancelled and now >= self._next_check:
+            self._next_check = now + self.check_interval
+            try:
+                self._check_interrupt()
+            except KeyboardInterrupt:
+                self._cancelled = True
+        super().raise_if_cancelled()
+
+def _deadline_after(time_budget_ms):
+    """时间预算（毫秒）对应的截止时刻（time.perf_counter 计时），无预算时为 None"""
+    return None if time_budget_ms is None else time.perf_counter() + max(time_budget_ms, 0) / 1000.0
+
+class _BlockSearchContext:
+    """组合搜索的公共上下文：单元块列式表、项目约束及候选方案评估"""
+    def __init__(self, project_power_mw, project_capacity_mwh, block_table, loop_start, loop_end, deadline=None, cancel_token=None):
+        self.deadline = deadline
+        self.cancel_token = cancel_token
+        self.table = block_table
+        self.unit_price = block_table.unit_price
+        self.project_power_mw = project_power_mw
+        self.project_capacity_mwh = project_capacity_mwh
+        self.loop_start = loop_start
+        self.loop_end = loop_end
+        self.power = block_table.power
+        self.capacity = block_table.capacity
+        self.equivalent = block_table.equivalent
+        self.actual_power = block_table.actual_power
+        self.has_reduced = block_table.has_reduced
+        self.dc_count = block_table.dc_count
+        self.description_rank = block_table.description_rank
+        # 共享搜索在单元块等价类上进行时为各类的成员 ((选择位掩码, 单元块), ...)，见 _collapse_equivalent_blocks
+        self.class_members = None
+        self.type_aggregates = block_table.type_aggregates
+        self.power_fixed = block_table.power_fixed
+        self.capacity_fixed = block_table.capacity_fixed
+        self.actual_power_fixed = block_table.actual_power_fixed
+        self.actual_power_fixed_per_kw = block_table.actual_power_fixed_per_kw
+        # 每 MWh 等效容量的成本（万元），各搜索引擎由等效容量的上下界换算成本界时使用
+        self.price_factor = 100 * self.unit_price
+        # 项目约束换算为 kWh/kW 整数下限
+        self.capacity_need = _fixed_need(project_capacity_mwh, ROUNDED_FIXED_SCALE)
+        # 三类组合按未取整的直流容量检查容量约束（与原遍历一致）
+        self.capacity_need_unrounded = _fixed_need(project_capacity_mwh, CAPACITY_FIXED_SCALE)
+        self.power_need = _fixed_need(project_power_mw, ROUNDED_FIXED_SCALE)
+        # 单块最低成本（万元），总块数为 N 的任何组合成本不低于 N 倍该值
+        self.min_block_cost = min(block_table.block_cost) if len(block_table) else 0.0
+
+    def checkpoint(self):
+        """
+        搜索引擎在每个总块数及单元块类型子集/网格批次前调用：
+        已取消时抛出 SolveCancelled，超出截止时刻时抛出 _SearchInterrupted
+        """
+        if self.cancel_token is not None:
+            self.cancel_token.raise_if_cancelled()
+        if self.deadline is not None and time.perf_counter() > self.deadline:
+            raise _SearchInterrupted()
+
+    def block_count_exhausted(self, pool, num_total_sel_blocks):
+        """总块数下界成本已超过候选池阈值：该总块数及更大的总块数均不可能进入窗口"""
+        return num_total_sel_blocks * self.min_block_cost - 0.01 > pool.threshold()
+
+    def cost_of(self, combo):
+        # V3.0: 计算真实成本（万元）= 等效容量 × 100 × 单价
+        # 先对等效容量求和再乘单价、取整（与原遍历一致）；改为对逐块成本 block_cost 求和时浮点舍入不同，约 1% 的组合取整后相差 0.01
+        equivalent_capacity = sum(n * self.equivalent[i] for i, n in combo)
+        return round(equivalent_capacity * 100 * self.unit_price, 2)
+
+    def check_constraints(self, combo):
+        """
+        检查候选组合 combo = ((块索引, 数量), ...)（按块索引升序）的容量和功率约束
+        满足时返回 (额定功率(kW), 直流容量(kWh))，否则返回 None
+        """
+        capacity = self.capacity_of(combo)
+        if len(combo) == 3:
+            if sum(n * self.capacity_fixed[i] for i, n in combo) < self.capacity_need_unrounded:
+                return None
+        elif capacity < self.capacity_need:
+            return None
+        power = _round_fixed(sum(n * self.power_fixed[i] for i, n in combo), POWER_FIXED_SCALE // ROUNDED_FIXED_SCALE,
+                             lambda: sum(n * self.power[i] for i, n in combo))
+        if any(self.has_reduced[i] for i, _ in combo):
+            # 有减簇配置时，检查实际功率输出约束
+            if self.actual_power_of(combo) < self.power_need:
+                return None
+        elif power < self.power_need:
+            return None
+        return power, capacity
+
+    def offer(self, pool, num_total_sel_blocks, combo):
+        # 先按成本过滤：窗口外的候选无需检查约束，也不分配排序键
+        cost = self.cost_of(combo)
+        if cost > pool.threshold():
+            return False
+        checked = self.check_constraints(combo)
+        if checked is None:
+            return False
+        power, capacity = checked
+        total_dc_containers = sum(n * self.dc_count[i] for i, n in combo)
+        indices, counts = zip(*combo)
+        return pool.offer((total_dc_containers, cost, power, num_total_sel_blocks, len(combo), indices, counts, capacity))
+
+    def capacity_of(self, combo):
+        """组合的直流容量（kWh）"""
+        return _round_fixed(sum(n * self.capacity_fixed[i] for i, n in combo), CAPACITY_FIXED_SCALE // ROUNDED_FIXED_SCALE,
+                            lambda: sum(n * self.capacity[i] for i, n in combo))
+
+    def actual_power_of(self, combo):
+        """组合的实际可输出功率（kW，定点累加后取整；恰为 .5 时按块描述排序做浮点累加，与方案说明中的算法一致）"""
+        combo = tuple(combo)
+        return _round_fixed(sum(n * self.actual_power_fixed[i] for i, n in combo), self.actual_power_fixed_per_kw,
+                            lambda: sum(n * self.actual_power[i] for i, n in sorted(combo, key=lambda x: self.description_rank[x[0]])))
+
+    def build_blocks_config(self, combo, choice=None):
+        """
+        组合的 blocks_config（按块描述排序）。搜索在单元块等价类上进行时（见 _collapse_equivalent_blocks），
+        各类展开为共享选择 choice 中的第一个成员，choice 为 None 时取该类的第一个成员
+        """
+        if self.class_members is None:
+            ordered = sorted(combo, key=lambda x: self.description_rank[x[0]])
+            return [(n, self.table.blocks[i]) for i, n in ordered]
+        config = [(n, next(block for mask, block in self.class_members[i] if choice is None or mask >> choice & 1)) for i, n in combo]
+        return sorted(config, key=lambda item: item[1]["block_description"])
+
+    def remaining_bounds(self, types, remaining, capacity_needed, use_actual_power):
+        """
+        剩余 remaining 块分配给 types 中各类型（每类至少1块）时的界：
+        返回 (等效容量下界, 直流容量上界, 功率上界)
+        """
+        sum_eq, min_eq, min_ratio, sum_cap, max_cap, sum_pw, max_pw, sum_act, max_act = self.type_aggregates(types)
+        extra = remaining - len(types)
+        eq_lower = sum_eq + extra * min_eq
+        if capacity_needed > 0 and capacity_needed * min_ratio > eq_lower:
+            eq_lower = capacity_needed * min_ratio
+        if use_actual_power:
+            return eq_lower, sum_cap + extra * max_cap, sum_act + extra * max_act
+        return eq_lower, sum_cap + extra * max_cap, sum_pw + extra * max_pw
+
+def _search_enumerate(ctx, pool):
+    """原 S1/S2/S3 逐场景搜索（按原遍历顺序提交候选）：S2 按闭式区间求解，S3 按顶点枚举后逐列闭式求解"""
+    n_blocks = len(ctx.table)
+    for num_total_sel_blocks in range(ctx.loop_start, ctx.loop_end + 1):
+        if num_total_sel_blocks == 0: continue
+        if ctx.block_count_exhausted(pool, num_total_sel_blocks): break
+        ctx.checkpoint()
+        for i in range(n_blocks): # Scenario 1
+            subset_pool = pool.for_types((i,))
+            if subset_pool is None: continue
+            ctx.offer(subset_pool, num_total_sel_blocks, ((i, num_total_sel_blocks),))
+        if num_total_sel_blocks >= 2: # Scenario 2
+            for pair in combinations(range(n_blocks), 2):
+                subset_pool = pool.for_types(pair)
+                if subset_pool is None: continue
+                ctx.checkpoint()
+                i, j = pair
+                _offer_pair_split(ctx, subset_pool, num_total_sel_blocks, (), i, j, num_total_sel_blocks, ctx.has_reduced[i] or ctx.has_reduced[j])
+        if num_total_sel_blocks >= 3 and n_blocks >= 3: # Scenario 3
+            for triple in combinations(range(n_blocks), 3):
+                if len(set(ctx.table.description_id[i] for i in triple)) < 3: continue
+                subset_pool = pool.for_types(triple)
+                if subset_pool is None: continue
+                ctx.checkpoint()
+                _offer_triple_splits(ctx, subset_pool, num_total_sel_blocks, (), triple, num_total_sel_blocks, any(ctx.has_reduced[i] for i in triple))
+        yield num_total_sel_blocks
+
+def _linear_count_range(lo, hi, base, slope, target):
+    """满足 base + n*slope >= target 的整数 n 与区间 [lo, hi] 的交集（可能为空）"""
+    if abs(slope) < EPSILON:
+        return (lo, hi) if base >= target else (1, 0)
+    bound = (target - base) / slope
+    if slope > 0:
+        return max(lo, math.ceil(bound - 1e-9)), hi
+    return lo, min(hi, math.floor(bound + 1e-9))
+
+def _offer_pair_split(ctx, pool, num_total_sel_blocks, partial, first_index, second_index, remaining, use_actual_power, capacity=0.0, power=0.0, equivalent=0.0):
+    """
+    两类单元块合计 remaining 块（first 取 n 块、second 取 remaining-n 块）的闭式求解。
+    容量、功率、成本都是 n 的线性函数，可行的 n 构成区间 [lo, hi]，按原遍历顺序（n 升序）提交其中的候选；
+    成本下界超过候选池阈值的 n 必然被拒绝：成本随 n 增加时此后的 n 都被拒绝，成本随 n 减少时直接跳到第一个可能被接受的 n。
+    capacity/power/equivalent 为 partial 中已分配块的累计值（S3 复用）。
+    """
+    power_values = ctx.actual_power if use_actual_power else ctx.power
+    lo, hi = _linear_count_range(1, remaining - 1, capacity + remaining * ctx.capacity[second_index], ctx.capacity[first_index] - ctx.capacity[second_index], ctx.project_capacity_mwh - EPSILON - 0.001)
+    lo, hi = _linear_count_range(lo, hi, power + remaining * power_values[second_index], power_values[first_index] - power_values[second_index], ctx.project_power_mw - EPSILON - 0.001)
+    if lo > hi:
+        return
+    # 上面的区间留有取整余量，用精确评估收紧到真正可行的两端
+    combo_for = lambda n: partial + ((first_index, n), (second_index, remaining - n))
+    while lo <= hi and ctx.check_constraints(combo_for(lo)) is None: lo += 1
+    while hi > lo and ctx.check_constraints(combo_for(hi)) is None: hi -= 1
+    if lo > hi:
+        return
+    slope = ctx.equivalent[first_index] - ctx.equivalent[second_index]
+    price_factor = ctx.price_factor
+    base = equivalent + remaining * ctx.equivalent[second_index]
+    n = lo
+    while n <= hi:
+        if (base + n * slope) * price_factor - 0.01 > pool.threshold():
+            limit = (pool.threshold() + 0.01) / price_factor
+            if slope >= 0 or limit == -float('inf'):
+                return
+            # 成本随 n 减少：跳到成本下界不超过阈值的第一个 n（此前的 n 均被拒绝，阈值不变）
+            n = max(n + 1, math.ceil((limit - base) / slope - 1e-9))
+            continue
+        ctx.offer(pool, num_total_sel_blocks, combo_for(n))
+        n += 1
+
+def _offer_triple_splits(ctx, pool, num_total_sel_blocks, partial, triple, remaining, use_actual_power, capacity=0.0, power=0.0, equivalent=0.0):
+    """
+    三类单元块合计 remaining 块的求解（顶点枚举 + 整数邻域）：
+    取 n1、n2 为自变量（n3 = remaining - n1 - n2），可行域是一个凸多边形。
+    先求出多边形顶点得到 LP 最优点与 n1 的取值范围，再按原遍历顺序（n1 升序）逐列求解；
+    每列成本的 LP 下界超过候选池阈值时跳过该列，越过最优点后该下界单调不减，超过阈值即停止。
+    返回 LP 最优值（等效容量下界），可行域为空时返回 None。
+    """
+    i, j, k = triple
+    power_values = ctx.actual_power if use_actual_power else ctx.power
+    price_factor = ctx.price_factor
+    # 约束统一写作 a*n1 + b*n2 >= c
+    constraints = (
+        (1.0, 0.0, 1.0),
+        (0.0, 1.0, 1.0),
+        (-1.0, -1.0, -(remaining - 1.0)),
+        (ctx.capacity[i] - ctx.capacity[k], ctx.capacity[j] - ctx.capacity[k], ctx.project_capacity_mwh - EPSILON - 0.001 - capacity - remaining * ctx.capacity[k]),
+        (power_values[i] - power_values[k], power_values[j] - power_values[k], ctx.project_power_mw - EPSILON - 0.001 - power - remaining * power_values[k]),
+    )
+    eq_base = equivalent + remaining * ctx.equivalent[k]
+    eq_d1 = ctx.equivalent[i] - ctx.equivalent[k]
+    eq_d2 = ctx.equivalent[j] - ctx.equivalent[k]
+    # 多边形顶点：以前三个约束构成的三角形为初始多边形，依次用容量、功率半平面裁剪
+    polygon = [(1.0, 1.0), (remaining - 2.0, 1.0), (1.0, remaining - 2.0)]
+    for a, b, c in constraints[3:]:
+        clipped = []
+        for (x1, y1), (x2, y2) in zip(polygon, polygon[1:] + polygon[:1]):
+            v1 = a * x1 + b * y1 - c; v2 = a * x2 + b * y2 - c
+            if v1 >= -1e-7: clipped.append((x1, y1))
+            if (v1 >= -1e-7) != (v2 >= -1e-7):
+                t = v1 / (v1 - v2)
+                clipped.append((x1 + t * (x2 - x1), y1 + t * (y2 - y1)))
+        polygon = clipped
+        if not polygon:
+            return None
+    vertices = [(eq_base + x * eq_d1 + y * eq_d2, x, y) for x, y in polygon]
+    lp_min_eq, lp_x, _ = min(vertices)
+    if lp_min_eq * price_factor - 0.01 > pool.threshold():
+        return lp_min_eq
+    x_low = max(1, math.ceil(min(v[1] for v in vertices) - 1e-7))
+    x_high = min(remaining - 2, math.floor(max(v[1] for v in vertices) + 1e-7))
+
+    def column_lower_bound(x):
+        y_low, y_high = -float('inf'), float('inf')
+        for a, b, c in constraints:
+            if abs(b) < EPSILON:
+                if a * x < c - 1e-7: return None
+            elif b > 0:
+                y_low = max(y_low, (c - a * x) / b)
+            else:
+                y_high = min(y_high, (c - a * x) / b)
+        if y_low > y_high + 1e-7:
+            return None
+        return eq_base + x * eq_d1 + (y_low if eq_d2 >= 0 else y_high) * eq_d2
+
+    for n1 in range(x_low, x_high + 1):
+        column_eq = column_lower_bound(n1)
+        if column_eq is None: continue
+        if column_eq * price_factor - 0.01 > pool.threshold():
+            if n1 >= lp_x: break
+            continue
+        _offer_pair_split(ctx, pool, num_total_sel_blocks, partial + ((i, n1),), j, k, remaining - n1, use_actual_power,
+                          capacity + n1 * ctx.capacity[i], power + n1 * power_values[i], equivalent + n1 * ctx.equivalent[i])
+    return lp_min_eq
+
+def _branch_block_counts(ctx, pool, num_total_sel_blocks, subset, use_actual_power, pos, remaining, partial, capacity, power, equivalent):
+    """
+    为 subset[pos:] 逐个分配块数的分支定界：
+    每一层用剩余类型的容量/功率上界判断可行性、用等效容量下界对照候选池阈值剪枝；
+    只剩三类/两类时分别交给 _offer_triple_splits / _offer_pair_split 求解
+    """
+    block_index = subset[pos]
+    if pos == len(subset) - 1:
+        ctx.offer(pool, num_total_sel_blocks, partial + ((block_index, remaining),))
+        return
+    if pos == len(subset) - 2:
+        _offer_pair_split(ctx, pool, num_total_sel_blocks, partial, block_index, subset[pos + 1], remaining, use_actual_power, capacity, power, equivalent)
+        return
+    if pos == len(subset) - 3:
+        _offer_triple_splits(ctx, pool, num_total_sel_blocks, partial, subset[pos:], remaining, use_actual_power, capacity, power, equivalent)
+        return
+    power_values = ctx.actual_power if use_actual_power else ctx.power
+    price_factor = ctx.price_factor
+    rest = subset[pos + 1:]
+    for n in range(1, remaining - len(rest) + 1):
+        cur_capacity = capacity + n * ctx.capacity[block_index]
+        cur_power = power + n * power_values[block_index]
+        cur_equivalent = equivalent + n * ctx.equivalent[block_index]
+        eq_lower, capacity_upper, power_upper = ctx.remaining_bounds(rest, remaining - n, ctx.project_capacity_mwh - 0.001 - cur_capacity, use_actual_power)
+        if cur_capacity + capacity_upper < ctx.project_capacity_mwh - EPSILON - 0.001: continue
+        if cur_power + power_upper < ctx.project_power_mw - EPSILON - 0.001: continue
+        if (cur_equivalent + eq_lower) * price_factor - 0.01 > pool.threshold(): continue
+        _branch_block_counts(ctx, pool, num_total_sel_blocks, subset, use_actual_power, pos + 1, remaining - n, partial + ((block_index, n),), cur_capacity, cur_power, cur_equivalent)
+
+def _min_extra_blocks(total, step, floor):
+    """使 total + extra × step ≥ floor 的最小非负整数 extra（step ≤ 0 且不满足时为 None），与逐个总块数比较的结果一致"""
+    if total >= floor:
+        return 0
+    if step <= 0:
+        return None
+    extra = max(math.ceil((floor - total) / step), 1)
+    while total + extra * step < floor:
+        extra += 1
+    while extra > 1 and total + (extra - 1) * step >= floor:
+        extra -= 1
+    return extra
+
+def _search_exact(ctx, pool):
+    """
+    精确搜索：逐个总块数、按原遍历顺序逐个单元块类型子集（最多 MAX_BLOCK_TYPES_PER_SOLUTION 类）做分支定界，
+    成本下界超过候选池阈值的子集本总块数内跳过（其候选必然被拒绝，跳过后阈值不变）。
+    当前最优可能在之后上升，阈值并非单调不增，因此子集不永久剔除，只记录对之后所有总块数都成立的成本下界：
+    子集的容量/功率上界随总块数单调增加，可行所需的最小总块数可直接算出，子集在达到该总块数时才加入活动列表（保持原遍历顺序）；
+    三类子集在固定总块数下的 LP 下界是总块数的凸函数，比上一总块数更高时即为之后所有总块数的下界，阈值低于它时不再计算 LP。
+    """
+    n_blocks = len(ctx.table)
+    max_types = min(MAX_BLOCK_TYPES_PER_SOLUTION, n_blocks)
+    price_factor = ctx.price_factor
+    capacity_floor = ctx.project_capacity_mwh - EPSILON - 0.001
+    power_floor = ctx.project_power_mw - EPSILON - 0.001
+    pending_subsets = {}  # 最小可行总块数 -> [[遍历序号, 子集参数, 上一总块数的 LP 下界, 之后所有总块数的 LP 下界], ...]
+    order = 0
+    for k in range(1, max_types + 1):
+        for subset in pool.type_subsets(n_blocks, k):
+            ctx.checkpoint()
+            subset_pool = pool.for_types(subset)
+            use_actual_power = any(ctx.has_reduced[i] for i in subset)
+            sum_eq, min_eq, min_ratio, sum_cap, max_cap, sum_pw, max_pw, sum_act, max_act = ctx.type_aggregates(subset)
+            if use_actual_power: sum_pw, max_pw = sum_act, max_act
+            extra_for_capacity = _min_extra_blocks(sum_cap, max_cap, capacity_floor)
+            extra_for_power = _min_extra_blocks(sum_pw, max_pw, power_floor)
+            if extra_for_capacity is None or extra_for_power is None: continue
+            first_feasible = max(len(subset) + max(extra_for_capacity, extra_for_power), ctx.loop_start, 1)
+            if first_feasible > ctx.loop_end: continue
+            # 子集的线性松弛下界（同时考虑容量和功率约束），与总块数无关
+            eq_floor = ctx.table.relaxed_minimum(ctx.equivalent, ctx.project_power_mw, ctx.project_capacity_mwh, subset, ctx.actual_power if use_actual_power else ctx.power)
+            pending_subsets.setdefault(first_feasible, []).append([order, (subset, subset_pool, use_actual_power, sum_eq, min_eq, eq_floor), None, eq_floor])
+            order += 1
+    active_subsets = []
+    for num_total_sel_blocks in range(ctx.loop_start, ctx.loop_end + 1):
+        if num_total_sel_blocks == 0: continue
+        if ctx.block_count_exhausted(pool, num_total_sel_blocks): break
+        ctx.checkpoint()
+        if num_total_sel_blocks in pending_subsets:
+            active_subsets = sorted(active_subsets + pending_subsets.pop(num_total_sel_blocks), key=lambda item: item[0])
+        for item in active_subsets:
+            subset, subset_pool, use_actual_power, sum_eq, min_eq, eq_floor = item[1]
+            extra = num_total_sel_blocks - len(subset)
+            if max(sum_eq + extra * min_eq, item[3]) * price_factor - 0.01 > subset_pool.threshold(): continue
+            ctx.checkpoint()
+            if len(subset) == 3:
+                lp_min_eq = _offer_triple_splits(ctx, subset_pool, num_total_sel_blocks, (), subset, num_total_sel_blocks, use_actual_power)
+                if lp_min_eq is not None and item[2] is not None and lp_min_eq > item[2] + EPSILON:
+                    item[3] = max(item[3], lp_min_eq)
+                item[2] = lp_min_eq
+            else:
+                _branch_block_counts(ctx, subset_pool, num_total_sel_blocks, subset, use_actual_power, 0, num_total_sel_blocks, (), 0.0, 0.0, 0.0)
+        yield num_total_sel_blocks
+
+def _offer_greedy_configs(ctx, pool):
+    """
+    限时搜索的贪心后备方案：每类单元块单独使用，取满足容量和功率约束的最少块数，提交给 pool（后备候选池），
+    超时前搜索尚未找到任何候选时仍有可行方案可返回。
+    当前最优按遍历顺序逐个比较决定，提前提交的候选会改变之后的比较结果，因此不提交给正式搜索的候选池。
+    """
+    for i in range(len(ctx.table)):
+        if pool.for_types((i,)) is None: continue
+        power = ctx.actual_power[i] if ctx.has_reduced[i] else ctx.power[i]
+        if ctx.capacity[i] <= EPSILON or power <= EPSILON: continue
+        n = max(math.ceil(ctx.project_capacity_mwh / ctx.capacity[i] - EPSILON), math.ceil(ctx.project_power_mw / power - EPSILON), ctx.loop_start, 1)
+        while n <= ctx.loop_end and ctx.check_constraints(((i, n),)) is None:
+            n += 1
+        if n <= ctx.loop_end:
+            ctx.offer(pool.for_types((i,)), n, ((i, n),))
+
+# 搜索引擎 fn(ctx, pool)：可以是普通函数，也可以是每完成一个总块数就 yield 该总块数的生成器（支持流式进度）
+SEARCH_ENGINES = {
+    "exact": _search_exact,
+    "enumerate": _search_enumerate,
+}
+
+def _search_steps(search_fn, ctx, pool):
+    """逐步执行搜索引擎，每完成一个总块数产出该总块数；普通函数引擎一次执行完毕，不产出进度"""
+    steps = search_fn(ctx, pool)
+    return steps if steps is not None else iter(())
+
+def _block_count_loop_range(project_power_mw, project_capacity_mwh, available_ess_blocks, max_device_sets):
+    """总块数的搜索范围 (loop_start, loop_end)：由最小单元块功率和用户套数限制确定"""
     min_block_power_val = float('inf'); has_positive_power_block = False
     for b in available_ess_blocks:
         if b["pcs_power_mw"] > EPSILON: min_block_power_val = min(min_block_power_val, b["pcs_power_mw"]); has_positive_power_block = True
     min_block_power = min_block_power_val if has_positive_power_block else 5.0 
     
-    # 获取系统时长类型用于动态优化
-    duration_hours, system_hour_type = calculate_project_duration_type(project_power_mw, project_capacity_mwh)
-    
     min_calc_blocks_p_for_power_ref = 0 
     if project_power_mw > EPSILON and min_block_power > EPSILON: min_calc_blocks_p_for_power_ref = math.ceil(project_power_mw / min_block_power)
     loop_start = max(1, 1)
@@ -379,201 +1262,16 @@ def find_best_combination_of_ess_blocks(project_power_mw, project_capacity_mwh,
     if loop_start > default_loop_end : loop_end = loop_start 
     loop_end = min(loop_end, max_device_sets)  # 再次确保不超过用户限制
 
-    if loop_end == 0 and loop_start == 0 and abs(project_power_mw) < EPSILON and abs(project_capacity_mwh) < EPSILON: pass 
-    elif loop_end == 0 and (project_power_mw > EPSILON or project_capacity_mwh > EPSILON):
-        best_solution["user_limit_warning"] = "由于套数限制或无可用单元块，无法进行有效搜索。"
-        return best_solution
-    
-    # V2.25 & V3.1性能优化: 根据系统时长类型和项目规模决定S3搜索上限
-    s3_max_sets = 10  # Default
-    if system_hour_type == 1:
-        s3_max_sets = 200
-    elif system_hour_type == 2:
-        # 2h系统：根据项目规模动态调整
-        if project_power_mw <= 20:
-            s3_max_sets = 15   # 小项目: 理论需要3-8套，留2倍余量
-        elif project_power_mw <= 100:
-            s3_max_sets = 30   # 中大项目: 理论需要7-14套，留2倍余量
-        else:
-            s3_max_sets = 50   # 超大项目: 理论需要14-40套，留余量
-    elif system_hour_type == 4:
-        # 4h系统：根据项目规模动态调整
-        if project_power_mw <= 20:
-            s3_max_sets = 10   # 小项目
-        elif project_power_mw <= 100:
-            s3_max_sets = 15   # 中大项目
-        else:
-            s3_max_sets = 20   # 超大项目（保持原值）
-    elif system_hour_type == 6:
-        s3_max_sets = 10  # 6h系统保持不变
-    elif system_hour_type >= 8:
-        s3_max_sets = 5
-        
-    # V3.0: 内部成本平衡阈值改为动态计算（万元）
-    INTERNAL_COST_TIE_EPSILON = 0.01 * 100 * unit_price  # 0.01 MWh × 100 × 单价
-    
-    # === 性能优化1: 预计算减簇标记 ===
-    block_has_reduced = {}
-    for block in available_ess_blocks:
-        has_reduced = False
-        for dc_detail in block.get("dc_containers_detail_list", []):
-            dc_spec = get_dc_spec_by_name(dc_detail["name"])
-            if dc_spec["reduced_clusters"] > 0:
-                has_reduced = True
-                break
-        block_has_reduced[block["block_description"]] = has_reduced
-    
-    # === 性能优化2: 缓存系统时长（避免重复计算）===
-    cached_system_hour_type = system_hour_type
-    cached_duration_hours = project_capacity_mwh / project_power_mw if project_power_mw > EPSILON else 0
-
-    def _calculate_actual_power_output(blocks_config):
-        """计算考虑PCS和直流容量双重约束的实际功率输出（性能优化：使用缓存的系统时长）"""
-        total_actual_power = 0
-        for num_blocks, block_data in blocks_config:
-            # 获取单个块的参数
-            pcs_rated_power = block_data["pcs_power_mw"]
-            block_dc_capacity = block_data["block_dc_capacity_mwh"]
-            
-            # 统一公式：min(PCS额定功率, 直流容量÷系统时长)
-            # 性能优化：使用缓存的系统时长，避免重复计算
-            if cached_system_hour_type > EPSILON:
-                dc_limited_power = block_dc_capacity / cached_system_hour_type
-                actual_block_power = min(pcs_rated_power, dc_limited_power)
-            else:
-                # 特殊情况：系统时长为0时，按PCS额定功率计算
-                actual_block_power = pcs_rated_power
-            
-            total_actual_power += num_blocks * actual_block_power
-        
-        return round(total_actual_power, 3)
+    return loop_start, loop_end
 
-    for num_total_sel_blocks in range(loop_start, loop_end + 1):
-        if num_total_sel_blocks == 0 : continue 
-        
-        def _update_internal_best_solution(cc_cost, cc_power, cc_capacity, cc_blocks_config):
-            nonlocal best_solution             
-            cc_total_dc_containers = get_total_physical_dc_containers_count(cc_blocks_config)
-            is_new_best = False
-            if best_solution["cost"] == float('inf'): is_new_best = True
-            else:
-                if cc_cost < best_solution["cost"] - INTERNAL_COST_TIE_EPSILON: is_new_best = True
-                elif cc_cost <= best_solution["cost"] + INTERNAL_COST_TIE_EPSILON: 
-                    current_best_dc_in_find_best = best_solution.get("total_dc_containers_calc", float('inf'))
-                    if cc_total_dc_containers < current_best_dc_in_find_best: is_new_best = True
-                    elif cc_total_dc_containers == current_best_dc_in_find_best: 
-                        if cc_cost < best_solution["cost"] - EPSILON: is_new_best = True
-                        elif abs(cc_cost - best_solution["cost"]) < EPSILON: 
-                            if cc_power < best_solution["power"] - EPSILON: is_new_best = True
-            if is_new_best:
-                best_solution.update({"cost": cc_cost, "power": cc_power, "capacity": cc_capacity, "blocks_config": cc_blocks_config, "total_dc_containers_calc": cc_total_dc_containers })
-
-        for block_type1 in available_ess_blocks: # Scenario 1
-            current_power = num_total_sel_blocks * block_type1["pcs_power_mw"]
-            current_capacity = num_total_sel_blocks * block_type1["block_dc_capacity_mwh"]
-            # V3.0: 计算真实成本（万元）= 等效容量 × 100 × 单价
-            current_equivalent_capacity = num_total_sel_blocks * block_type1["block_equivalent_capacity_mwh"]
-            current_cost = current_equivalent_capacity * 100 * unit_price  # 万元
-            current_power = round(current_power,3); current_capacity = round(current_capacity,3); current_cost = round(current_cost,2)
-            
-            # 检查容量约束
-            if current_capacity >= project_capacity_mwh - EPSILON:
-                current_blocks_config = sorted([(num_total_sel_blocks, block_type1)], key=lambda x:x[1]["block_description"])
-                
-                # 检查是否包含减簇配置，决定是否应用实际功率约束
-                # 性能优化：使用预计算的减簇标记
-                has_reduced_clusters = block_has_reduced[block_type1["block_description"]]
-                
-                if has_reduced_clusters:
-                    # 有减簇配置时，检查实际功率输出约束
-                    actual_power_output = _calculate_actual_power_output(current_blocks_config)
-                    if actual_power_output >= project_power_mw - EPSILON:
-                        _update_internal_best_solution(current_cost, current_power, current_capacity, current_blocks_config)
-                else:
-                    # 无减簇配置时，只需检查额定功率约束
-                    if current_power >= project_power_mw - EPSILON:
-                        _update_internal_best_solution(current_cost, current_power, current_capacity, current_blocks_config)
-        if num_total_sel_blocks >= 2: # Scenario 2
-            for i in range(len(available_ess_blocks)):
-                block_type1 = available_ess_blocks[i]
-                for j in range(i + 1, len(available_ess_blocks)): 
-                    block_type2 = available_ess_blocks[j]
-                    for num_type1_blocks in range(1, num_total_sel_blocks): 
-                        num_type2_blocks = num_total_sel_blocks - num_type1_blocks
-                        if num_type2_blocks <= 0: continue 
-                        current_power_s2 = (num_type1_blocks * block_type1["pcs_power_mw"] + num_type2_blocks * block_type2["pcs_power_mw"])
-                        current_capacity_s2 = (num_type1_blocks * block_type1["block_dc_capacity_mwh"] + num_type2_blocks * block_type2["block_dc_capacity_mwh"])
-                        # V3.0: 计算真实成本（万元）
-                        current_equivalent_capacity_s2 = (num_type1_blocks * block_type1["block_equivalent_capacity_mwh"] + num_type2_blocks * block_type2["block_equivalent_capacity_mwh"])
-                        current_cost_s2 = current_equivalent_capacity_s2 * 100 * unit_price
-                        current_power_s2 = round(current_power_s2,3); current_capacity_s2 = round(current_capacity_s2,3); current_cost_s2 = round(current_cost_s2,2)
-                        
-                        # 检查容量约束
-                        if current_capacity_s2 >= project_capacity_mwh - EPSILON:
-                            current_blocks_config_s2 = sorted([(num_type1_blocks, block_type1), (num_type2_blocks, block_type2)], key=lambda x: x[1]["block_description"])
-                            
-                            # 检查是否包含减簇配置，决定是否应用实际功率约束
-                            # 性能优化：使用预计算的减簇标记
-                            has_reduced_clusters_s2 = any(
-                                block_has_reduced[block_data["block_description"]]
-                                for _, block_data in current_blocks_config_s2
-                            )
-                            
-                            if has_reduced_clusters_s2:
-                                # 有减簇配置时，检查实际功率输出约束
-                                actual_power_output_s2 = _calculate_actual_power_output(current_blocks_config_s2)
-                                if actual_power_output_s2 >= project_power_mw - EPSILON:
-                                    _update_internal_best_solution(current_cost_s2, current_power_s2, current_capacity_s2, current_blocks_config_s2)
-                            else:
-                                # 无减簇配置时，只需检查额定功率约束
-                                if current_power_s2 >= project_power_mw - EPSILON:
-                                    _update_internal_best_solution(current_cost_s2, current_power_s2, current_capacity_s2, current_blocks_config_s2)
-        
-        if num_total_sel_blocks >= 3 and num_total_sel_blocks <= s3_max_sets: # V2.25: 使用动态上限
-            if len(available_ess_blocks) >= 3 : 
-                for block_indices_combo in combinations(range(len(available_ess_blocks)), 3):
-                    block_type1 = available_ess_blocks[block_indices_combo[0]]; block_type2 = available_ess_blocks[block_indices_combo[1]]; block_type3 = available_ess_blocks[block_indices_combo[2]]
-                    if len(set([block_type1["block_description"], block_type2["block_description"], block_type3["block_description"]])) < 3: continue
-                    for n1 in range(1, num_total_sel_blocks - 1):
-                        # 性能优化3: 预计算n1的容量贡献（用于快速容量检查）
-                        n1_capacity = n1 * block_type1["block_dc_capacity_mwh"]
-                        
-                        for n2 in range(1, num_total_sel_blocks - n1): 
-                            n3 = num_total_sel_blocks - n1 - n2
-                            if n3 >= 1:
-                                # 性能优化3: 容量预检查（提前剪枝）
-                                current_capacity_s3 = n1_capacity + n2*block_type2["block_dc_capacity_mwh"] + n3*block_type3["block_dc_capacity_mwh"]
-                                
-                                # 如果容量不满足要求，直接跳过（避免计算功率和成本）
-                                if current_capacity_s3 < project_capacity_mwh - EPSILON:
-                                    continue
-                                
-                                # 通过容量检查后，才计算功率和成本
-                                current_power_s3 = (n1*block_type1["pcs_power_mw"] + n2*block_type2["pcs_power_mw"] + n3*block_type3["pcs_power_mw"])
-                                # V3.0: 计算真实成本（万元）
-                                current_equivalent_capacity_s3 = (n1*block_type1["block_equivalent_capacity_mwh"] + n2*block_type2["block_equivalent_capacity_mwh"] + n3*block_type3["block_equivalent_capacity_mwh"])
-                                current_cost_s3 = current_equivalent_capacity_s3 * 100 * unit_price
-                                current_power_s3 = round(current_power_s3,3); current_capacity_s3 = round(current_capacity_s3,3); current_cost_s3 = round(current_cost_s3,2)
-                                
-                                current_blocks_config_s3 = sorted([(n1, block_type1), (n2, block_type2), (n3, block_type3)], key=lambda x: x[1]["block_description"])
-                                
-                                # 检查是否包含减簇配置，决定是否应用实际功率约束
-                                # 性能优化：使用预计算的减簇标记
-                                has_reduced_clusters_s3 = any(
-                                    block_has_reduced[block_data["block_description"]]
-                                    for _, block_data in current_blocks_config_s3
-                                )
-                                
-                                if has_reduced_clusters_s3:
-                                    # 有减簇配置时，检查实际功率输出约束
-                                    actual_power_output_s3 = _calculate_actual_power_output(current_blocks_config_s3)
-                                    if actual_power_output_s3 >= project_power_mw - EPSILON:
-                                        _update_internal_best_solution(current_cost_s3, current_power_s3, current_capacity_s3, current_blocks_config_s3)
-                                else:
-                                    # 无减簇配置时，只需检查额定功率约束
-                                    if current_power_s3 >= project_power_mw - EPSILON:
-                                        _update_internal_best_solution(current_cost_s3, current_power_s3, current_capacity_s3, current_blocks_config_s3)
-    
+def _apply_best_entry(best_solution, ctx, best_entry, choice=None):
+    """把候选池中的最优候选写入 best_solution（blocks_config 仅在此时生成，choice 见 build_blocks_config）"""
+    if best_entry is not None:
+        cc_total_dc_containers, cc_cost, cc_power, _, _, cc_indices, cc_counts, cc_capacity = best_entry
+        best_solution.update({"cost": cc_cost, "power": cc_power / ROUNDED_FIXED_SCALE, "capacity": cc_capacity / ROUNDED_FIXED_SCALE, "blocks_config": ctx.build_blocks_config(zip(cc_indices, cc_counts), choice), "total_dc_containers_calc": cc_total_dc_containers})
+
+def _finish_best_solution(best_solution):
+    """汇总最优组合的单元块明细（供消息和界面显示）"""
     if abs(best_solution["cost"] - float('inf')) > EPSILON : 
         block_counts_condensed = {}; temp_block_list_for_condensing = []
         if best_solution["blocks_config"]: 
@@ -611,30 +1309,401 @@ def find_best_combination_of_ess_blocks(project_power_mw, project_capacity_mwh,
             del best_solution["total_dc_containers_calc"]
     return best_solution
 
-def get_optimal_solution_for_dc_family(target_dc_family, project_power_mw, project_capacity_mwh, max_device_sets=100):
+def _blocks_summary(blocks_config):
+    """单元块构成摘要 [{"block_description", "count"}, ...]（流式事件用）"""
+    return [{"block_description": block["block_description"], "count": count} for count, block in blocks_config]
+
+def find_best_combination_of_ess_blocks(project_power_mw, project_capacity_mwh, available_ess_blocks, system_hour_type, target_dc_family, max_device_sets=100, search_engine=None, cancel_token=None):
+    return _final_solution(iter_best_combination_of_ess_blocks(project_power_mw, project_capacity_mwh, available_ess_blocks, system_hour_type, target_dc_family, max_device_sets, search_engine, cancel_token))
+
+def iter_best_combination_of_ess_blocks(project_power_mw, project_capacity_mwh, available_ess_blocks, system_hour_type, target_dc_family, max_device_sets=100, search_engine=None, cancel_token=None):
+    """
+    find_best_combination_of_ess_blocks 的流式版本，依次产出事件字典：
+      {"type": "incumbent", "cost", "power", "capacity", "total_dc_containers", "blocks_summary"}  出现更优的当前最优组合
+      {"type": "progress", "num_total_sel_blocks", "loop_end"}                                     完成一个总块数
+      {"type": "result", "solution"}                                                              最后一个事件，solution 即原函数返回值
+    cancel_token: CancellationToken，搜索检查点发现已取消时抛出 SolveCancelled
+    """
+    search_fn = SEARCH_ENGINES.get(search_engine or DEFAULT_SEARCH_ENGINE)
+    if search_fn is None:
+        raise ValueError(f"未知的组合搜索引擎: {search_engine}")
+    # V3.0: 获取单价
+    unit_price = get_unit_price(system_hour_type, target_dc_family)
+    if unit_price is None:
+        # 如果没有定义单价，返回错误
+        yield {"type": "result", "solution": {
+            "cost": float('inf'), "power": 0, "capacity": 0, "blocks_config": [], 
+            "block_details_for_message": [], "block_details_for_display": [], 
+            "user_limit_warning": f"系统时长类型{system_hour_type}h和DC家族{target_dc_family}的单价未定义", 
+            "total_dc_containers_calc": float('inf')
+        }}
+        return
+    
+    best_solution = {
+        "cost": float('inf'), "power": 0, "capacity": 0, "blocks_config": [], 
+        "block_details_for_message": [], "block_details_for_display": [], "user_limit_warning": "", "total_dc_containers_calc": float('inf')
+    }
+    if abs(project_power_mw) < EPSILON and abs(project_capacity_mwh) < EPSILON: 
+        best_solution["cost"] = 0; best_solution["total_dc_containers_calc"] = 0
+        yield {"type": "result", "solution": best_solution}; return
+    if not available_ess_blocks:
+        yield {"type": "result", "solution": best_solution}; return
+    
+    # 获取系统时长类型用于动态优化
+    duration_hours, system_hour_type = calculate_project_duration_type(project_power_mw, project_capacity_mwh)
+    
+    loop_start, loop_end = _block_count_loop_range(project_power_mw, project_capacity_mwh, available_ess_blocks, max_device_sets)
+
+    if loop_end == 0 and loop_start == 0 and abs(project_power_mw) < EPSILON and abs(project_capacity_mwh) < EPSILON: pass 
+    elif loop_end == 0 and (project_power_mw > EPSILON or project_capacity_mwh > EPSILON):
+        best_solution["user_limit_warning"] = "由于套数限制或无可用单元块，无法进行有效搜索。"
+        yield {"type": "result", "solution": best_solution}; return
+    
+    # V3.0: 内部成本平衡阈值改为动态计算（万元）
+    INTERNAL_COST_TIE_EPSILON = 0.01 * 100 * unit_price  # 0.01 MWh × 100 × 单价
+    
+    block_table = EssBlockTable(available_ess_blocks, system_hour_type, unit_price)
+    ctx = _BlockSearchContext(project_power_mw, project_capacity_mwh, block_table, loop_start, loop_end, cancel_token=cancel_token)
+    pool = _CandidatePool(INTERNAL_COST_TIE_EPSILON)
+    incumbent = None
+    for num_total_sel_blocks in _search_steps(search_fn, ctx, pool):
+        best_entry = pool.best()
+        if best_entry is not None and best_entry != incumbent:
+            incumbent = best_entry
+            yield {"type": "incumbent", "cost": best_entry[1], "power": best_entry[2] / ROUNDED_FIXED_SCALE, "capacity": best_entry[7] / ROUNDED_FIXED_SCALE, "total_dc_containers": best_entry[0],
+                   "blocks_summary": _blocks_summary(ctx.build_blocks_config(zip(best_entry[5], best_entry[6])))}
+        yield {"type": "progress", "num_total_sel_blocks": num_total_sel_blocks, "loop_end": loop_end}
+    _apply_best_entry(best_solution, ctx, pool.best())
+    yield {"type": "result", "solution": _finish_best_solution(best_solution)}
+
+def _final_solution(events):
+    """消费流式事件，返回最后 result 事件中的方案"""
+    event = None
+    for event in events:
+        pass
+    return event["solution"]
+
+def _merge_orders(sequences):
+    """
+    把若干序列合并为一个全序，保持每个序列内部的相对顺序（相等的元素视为同一元素，可并列时先出现者在前）；
+    不存在这样的全序时返回 None
+    """
+    first_seen = {}; successors = {}; in_degree = {}
+    for sequence in sequences:
+        for item in sequence:
+            if item not in first_seen:
+                first_seen[item] = len(first_seen); successors[item] = []; in_degree[item] = 0
+        for first, second in zip(sequence, sequence[1:]):
+            if second not in successors[first]:
+                successors[first].append(second); in_degree[second] += 1
+    ready = [item for item in first_seen if in_degree[item] == 0]
+    merged = []
+    while ready:
+        item = min(ready, key=first_seen.get)
+        ready.remove(item)
+        merged.append(item)
+        for next_item in successors[item]:
+            in_degree[next_item] -= 1
+            if in_degree[next_item] == 0: ready.append(next_item)
+    return merged if len(merged) == len(first_seen) else None
+
+def _merge_block_orders(block_lists):
+    """
+    把各选择的单元块列表合并为一个全序，保持每个列表内部的相对顺序（按块描述识别同一单元块）。
+    这样各选择在联合表上的块索引与其原列表的顺序一致，遍历顺序决胜规则不变；不存在这样的全序时返回 None。
+    """
+    blocks_by_description = {}
+    for blocks in block_lists:
+        for block in blocks:
+            blocks_by_description.setdefault(block["block_description"], block)
+    merged = _merge_orders([[block["block_description"] for block in blocks] for blocks in block_lists])
+    return None if merged is None else [blocks_by_description[desc] for desc in merged]
+
+def _collapse_equivalent_blocks(table, block_masks, n_choices, system_hour_type, unit_price):
+    """
+    把数值特征（额定功率, 直流容量, 等效容量, 电池舱数, 是否减簇；浮点值按位比较）完全相同的单元块归为等价类，组合搜索只在各类上进行：
+    同类的块在任何组合中可以互换，可行性、成本及排序键的数值部分均不变。
+    类的顺序与每个选择中各类第一个成员的顺序一致，各选择的最优候选展开为其第一个成员后与不合并时相同（遍历顺序决胜规则不变）；
+    成员只在生成方案配置时展开（见 _BlockSearchContext.build_blocks_config），供规整性评分和块描述使用。
+    同一选择内含同类的多个块时，按原遍历顺序它们各自的组合会先后与当前最优比较，合并后比较次序改变，此时不合并。
+    返回 (等价类单元块表, 各类的选择位掩码, 各类成员 ((选择位掩码, 单元块), ...))；没有可合并的块、某选择含同类的多个块或不存在一致的类顺序时不合并，各类成员为 None
+    """
+    signatures = [(table.power[i], table.capacity[i], table.equivalent[i], table.dc_count[i], table.has_reduced[i])
+                  for i in range(len(table))]
+    class_ids = {}
+    block_classes = [class_ids.setdefault(signature, len(class_ids)) for signature in signatures]
+    order = None
+    choice_classes = [[k for k, mask in zip(block_classes, block_masks) if mask >> c & 1] for c in range(n_choices)]
+    if len(class_ids) < len(table) and all(len(set(classes)) == len(classes) for classes in choice_classes):
+        order = _merge_orders(choice_classes)
+    if order is None:
+        return table, tuple(block_masks), None
+    members = [[] for _ in class_ids]
+    for k, mask, block in zip(block_classes, block_masks, table.blocks):
+        members[k].append((mask, block))
+    class_members = tuple(tuple(members[k]) for k in order)
+    class_masks = []
+    for class_member in class_members:
+        mask = 0
+        for member_mask, _ in class_member:
+            mask |= member_mask
+        class_masks.append(mask)
+    class_table = EssBlockTable([class_member[0][1] for class_member in class_members], system_hour_type, unit_price)
+    return class_table, tuple(class_masks), class_members
+
+def _prepare_shared_blocks(choice_blocks, union_blocks, system_hour_type, unit_price):
+    """
+    多个全局DC规格选择共享搜索的单元块表预处理（与项目功率/容量无关）：
+    返回 (联合单元块等价类表, 各类的选择位掩码, 各选择自身的单元块表, 各类成员)（见 _collapse_equivalent_blocks）
+    """
+    # 块掩码：第 c 位表示第 c 个共享选择可用该块
+    union_index = {block["block_description"]: i for i, block in enumerate(union_blocks)}
+    block_masks = [0] * len(union_blocks)
+    for c, available_ess_blocks in enumerate(choice_blocks):
+        for block in available_ess_blocks:
+            block_masks[union_index[block["block_description"]]] |= 1 << c
+    union_table = EssBlockTable(union_blocks, system_hour_type, unit_price)
+    choice_tables = tuple(EssBlockTable(blocks, system_hour_type, unit_price) for blocks in choice_blocks)
+    class_table, class_masks, class_members = _collapse_equivalent_blocks(union_table, block_masks, len(choice_blocks), system_hour_type, unit_price)
+    return class_table, class_masks, choice_tables, class_members
+
+def _plan_shared_search(choice_blocks, system_hour_type, unit_price):
+    """
+    共享搜索的分部计划：[(该部分包含的选择在 choice_blocks 中的下标, _prepare_shared_blocks 结果), ...]。
+    通常所有选择合并为一个部分；各选择的块顺序无法合并时逐个选择单独共享搜索（结果相同）
+    """
+    union_blocks = _merge_block_orders(choice_blocks)
+    if union_blocks is not None:
+        return ((tuple(range(len(choice_blocks))), _prepare_shared_blocks(choice_blocks, union_blocks, system_hour_type, unit_price)),)
+    return tuple(((p,), _prepare_shared_blocks([blocks], _merge_block_orders([blocks]) or blocks, system_hour_type, unit_price))
+                 for p, blocks in enumerate(choice_blocks))
+
+class _DcChoicesSearch:
+    """
+    一次共享搜索求解多个全局DC规格选择：dc_choices = [(全局DC规格名列表, 单元块列表), ...]。
+    搜索在所有选择的联合单元块表上进行，每块按位掩码标记其可用的选择，各选择的最优方案同时跟踪，结果与单独求解相同；
+    每完成一个总块数标记其中已求解完毕的选择（见 _SharedCandidatePools.mark_finished），
+    成本下界超出已求解完毕选择的最终排序窗口的选择不再搜索（见 _SharedCandidatePools.exclude_above），不会进入最终排序。
+    steps() 逐个总块数推进搜索，results() 随时给出各选择当前的求解结果（格式同 find_best_combination_of_ess_blocks）。
+    给定截止时刻 deadline 时，超时后 steps() 提前结束（interrupted 置为 True），cost_lower_bound() 给出最优成本的下界；
+    cancel_token 已取消时 steps() 抛出 SolveCancelled。
+    engine 为 ConfiguratorEngine 时，与项目功率/容量无关的单元块表预处理（见 _plan_shared_search）取自引擎缓存。
+    给定截止时刻时以贪心方案作后备（见 _offer_greedy_configs），超时前搜索尚未找到任何候选时才采用，不影响完整搜索的结果。
+    alternatives 为 _alternatives_spec 规范化后的备选方案参数，给定时同一次搜索中收集备选方案（见 _AlternativeCollector）。
+    """
+    def __init__(self, project_power_mw, project_capacity_mwh, dc_choices, system_hour_type, target_dc_family, max_device_sets, search_engine, cost_similarity_threshold, deadline=None, cancel_token=None, engine=None, alternatives=None):
+        self.search_fn = SEARCH_ENGINES.get(search_engine or DEFAULT_SEARCH_ENGINE)
+        if self.search_fn is None:
+            raise ValueError(f"未知的组合搜索引擎: {search_engine}")
+        self.deadline = deadline
+        self.cancel_token = cancel_token
+        self.interrupted = False
+        self.alternatives = _AlternativeCollector(*alternatives, cost_similarity_threshold) if alternatives else None
+        self.fixed_results = [None] * len(dc_choices)
+        self.parts = []  # [(共享选择的原顺序列表, 搜索上下文, 共享候选池, 后备候选池, 进度), ...]
+        unit_price = get_unit_price(system_hour_type, target_dc_family)
+        shared_choices = []
+        for order, (global_dc_names, available_ess_blocks) in enumerate(dc_choices):
+            loop_start, loop_end = _block_count_loop_range(project_power_mw, project_capacity_mwh, available_ess_blocks, max_device_sets) if available_ess_blocks else (0, 0)
+            if unit_price is None or loop_start != 1 or loop_end < 1:
+                # 无单价、功率/容量为0或套数限制导致无法搜索等情况，沿用单独求解的处理
+                self.fixed_results[order] = find_best_combination_of_ess_blocks(project_power_mw, project_capacity_mwh, available_ess_blocks, system_hour_type, target_dc_family, max_device_sets, search_engine, cancel_token)
+            else:
+                shared_choices.append((order, available_ess_blocks, loop_end))
+        if not shared_choices:
+            return
+        choice_blocks = [blocks for _, blocks, _ in shared_choices]
+        if engine is None:
+            plan = _plan_shared_search(choice_blocks, system_hour_type, unit_price)
+        else:
+            plan = engine.shared_search_plan([dc_choices[order][0] for order, _, _ in shared_choices], choice_blocks, system_hour_type, unit_price)
+        for positions, prepared in plan:
+            self._add_part(project_power_mw, project_capacity_mwh, [shared_choices[p] for p in positions], prepared, unit_price, cost_similarity_threshold)
+
+    def _add_part(self, project_power_mw, project_capacity_mwh, shared_choices, prepared, unit_price, cost_similarity_threshold):
+        union_table, class_masks, choice_tables, class_members = prepared
+        # V3.0: 内部成本平衡阈值改为动态计算（万元）
+        INTERNAL_COST_TIE_EPSILON = 0.01 * 100 * unit_price  # 0.01 MWh × 100 × 单价
+        pools = [_CandidatePool(INTERNAL_COST_TIE_EPSILON) for _ in shared_choices]
+        loop_ends = [loop_end for _, _, loop_end in shared_choices]
+        cost_lower_bounds = [table.lower_bounds(project_power_mw, project_capacity_mwh)[0] for table in choice_tables]
+        min_block_costs = [min(table.block_cost) for table in choice_tables]
+        shared = _SharedCandidatePools(pools, loop_ends, list(class_masks), cost_similarity_threshold, cost_lower_bounds, min_block_costs)
+        # 后备候选池：贪心方案，仅在超时前搜索未找到候选时采用
+        fallback = _SharedCandidatePools([_CandidatePool(INTERNAL_COST_TIE_EPSILON) for _ in shared_choices], loop_ends, list(class_masks), cost_similarity_threshold, cost_lower_bounds, min_block_costs)
+        ctx = _BlockSearchContext(project_power_mw, project_capacity_mwh, union_table, 1, max(loop_ends), self.deadline, self.cancel_token)
+        ctx.class_members = class_members
+        shared.ctx = ctx
+        shared.alternatives = self.alternatives
+        # 各部分已完成的总块数、是否搜索完毕
+        self.parts.append(([order for order, _, _ in shared_choices], ctx, shared, fallback, {"completed": 0, "finished": False}))
+
+    def steps(self):
+        """逐个总块数推进搜索，产出 (总块数, 总块数上限)；超出截止时刻时停止"""
+        for _, ctx, shared, fallback, progress in self.parts:
+            self._exclude_by_finished()
+            try:
+                if self.deadline is not None:
+                    _offer_greedy_configs(ctx, fallback)
+                for num_total_sel_blocks in _search_steps(self.search_fn, ctx, shared):
+                    progress["completed"] = num_total_sel_blocks
+                    shared.mark_finished(num_total_sel_blocks)
+                    self._exclude_by_finished()
+                    yield num_total_sel_blocks, ctx.loop_end
+            except _SearchInterrupted:
+                self.interrupted = True
+                return
+            progress["finished"] = True
+
+    def _finished_min_cost(self):
+        """已求解完毕的选择（单独求解的、已搜索完毕部分的及搜索中已标记完毕的）最优方案成本的最小值"""
+        costs = [result["cost"] for result in self.fixed_results if result is not None]
+        for _, _, shared, _, progress in self.parts:
+            if progress["finished"]:
+                costs.extend(entry[1] for entry in (pool.best() for pool in shared.pools) if entry is not None)
+            else:
+                costs.append(shared.finished_min_cost())
+        return min(costs, default=float('inf'))
+
+    def _exclude_by_finished(self):
+        """按已求解完毕的选择的最低成本剔除未搜索完毕部分中不可能进入最终排序窗口的选择（见 _SharedCandidatePools.exclude_above）"""
+        finished_cost = self._finished_min_cost()
+        if finished_cost < float('inf'):
+            for _, _, shared, _, progress in self.parts:
+                if not progress["finished"]:
+                    shared.exclude_above(finished_cost)
+
+    def cost_lower_bound(self):
+        """
+        各选择最优成本的最小值的下界：搜索完毕的部分取候选池最低成本；
+        未完毕部分的存活选择再与 max(线性松弛下界, 未完成的最小总块数 × 单块最低成本) 取小
+        """
+        bound = min((result["cost"] for result in self.fixed_results if result is not None), default=float('inf'))
+        for _, ctx, shared, _, progress in self.parts:
+            unexplored_lower = (progress["completed"] + 1) * ctx.min_block_cost - 0.01
+            for c, pool in enumerate(shared.pools):
+                bound = min(bound, pool.min_cost)
+                if not progress["finished"] and shared.live[c]:
+                    bound = min(bound, max(shared.cost_lower_bounds[c], unexplored_lower))
+        return bound
+
+    def best_entries(self):
+        """各共享选择当前的最优候选（用于判断当前最优方案是否变化）"""
+        return tuple(pool.best() for _, _, shared, _, _ in self.parts for pool in shared.pools)
+
+    def live_count(self):
+        """仍在搜索的共享选择数"""
+        return sum(sum(shared.live) for _, _, shared, _, _ in self.parts)
+
+    def results(self):
+        """按 dc_choices 顺序返回各选择当前的求解结果（每次调用都生成新的字典）"""
+        results = [dict(result) if result is not None else None for result in self.fixed_results]
+        for orders, ctx, shared, fallback, progress in self.parts:
+            for c, order in enumerate(orders):
+                best_solution = {
+                    "cost": float('inf'), "power": 0, "capacity": 0, "blocks_config": [],
+                    "block_details_for_message": [], "block_details_for_display": [], "user_limit_warning": "", "total_dc_containers_calc": float('inf')
+                }
+                if not shared.live[c]:
+                    best_solution["skipped_by_bound"] = True
+                best_entry = shared.pools[c].best()
+                if best_entry is None and not progress["finished"]:
+                    best_entry = fallback.pools[c].best()
+                _apply_best_entry(best_solution, ctx, best_entry, c)
+                results[order] = _finish_best_solution(best_solution)
+        return results
+
+def _attach_optimality(solution, lower_bound_cost, proven):
+    """
+    写入限时搜索的最优性信息：lower_bound_cost 最优成本下界（万元，向下取两位小数）、
+    optimality_gap 相对差距 (成本-下界)/成本、optimality_proven 是否已证明最优（搜索完整结束时下界即方案成本）。
+    budget_exhausted_without_solution 为 True 表示时间预算用尽时尚未找到任何可行方案（不代表无可行方案），message 随之改为相应提示。
+    """
+    cost = solution.get("total_cost", solution.get("cost", float('inf')))
+    lower_bound_cost = cost if proven else min(lower_bound_cost, cost)
+    if abs(lower_bound_cost - float('inf')) > EPSILON:
+        solution["lower_bound_cost"] = math.floor(max(lower_bound_cost, 0) * 100 + 1e-6) / 100
+    else:
+        solution["lower_bound_cost"] = None
+    if proven:
+        solution["optimality_gap"] = 0.0
+    elif abs(cost - float('inf')) > EPSILON and solution["lower_bound_cost"] is not None:
+        solution["optimality_gap"] = round((cost - solution["lower_bound_cost"]) / cost, 6) if cost > EPSILON else 0.0
+    else:
+        solution["optimality_gap"] = None
+    solution["optimality_proven"] = proven
+    solution["budget_exhausted_without_solution"] = not proven and abs(cost - float('inf')) <= EPSILON
+    if solution["budget_exhausted_without_solution"]:
+        dc_family = solution.get("dc_family_technology")
+        prefix = f"基于 {dc_family} 直流技术: " if dc_family in ("5MW", "7.5MW") else ""
+        solution["message"] = prefix + "时间预算已用尽，尚未找到可行方案（并非无可行方案），请增加时间预算后重试。"
+    return solution
+
+def _solution_lower_bound(solution):
+    """带最优性信息的方案的成本下界（下界为 None 表示不存在可行方案，即正无穷）"""
+    lower_bound_cost = solution.get("lower_bound_cost")
+    return float('inf') if lower_bound_cost is None else lower_bound_cost
+
+def _result_event(solution, time_budget_ms, lower_bound_cost=None, proven=True):
+    """流式 result 事件；给定时间预算时为方案附加最优性信息（未搜索即返回的情形视为已证明）"""
+    if time_budget_ms is not None:
+        _attach_optimality(solution, solution.get("cost", float('inf')) if lower_bound_cost is None else lower_bound_cost, proven)
+    return {"type": "result", "solution": solution}
+
+def get_optimal_solution_for_dc_family(target_dc_family, project_power_mw, project_capacity_mwh, max_device_sets=100, search_engine=None, time_budget_ms=None, cancel_token=None, alternatives=None):
+    return default_engine().solve_family(target_dc_family, project_power_mw, project_capacity_mwh, max_device_sets, search_engine, time_budget_ms, cancel_token, alternatives=alternatives)
+
+def iter_optimal_solution_for_dc_family(target_dc_family, project_power_mw, project_capacity_mwh, max_device_sets=100, search_engine=None, time_budget_ms=None, cancel_token=None, alternatives=None):
+    """
+    get_optimal_solution_for_dc_family 的流式版本，依次产出事件字典：
+      {"type": "incumbent", "cost", "power", "capacity", "total_dc_containers", "blocks_summary", "chosen_global_dc_specs", "solution"}
+          当前最优方案变化（solution 为此刻停止搜索时的完整方案）
+      {"type": "progress", "num_total_sel_blocks", "loop_end", "dc_choices_live", "dc_choices_total"}
+          完成一个总块数（所有全局DC规格选择共用一次搜索，dc_choices_live 为尚未被下界剔除的选择数）
+      {"type": "result", "solution"}
+          最后一个事件，solution 即 get_optimal_solution_for_dc_family 的返回值
+    time_budget_ms: 搜索时间预算（毫秒）。用尽时停止搜索并返回已找到的最优方案（尚未找到时返回贪心后备方案），
+      方案中附加 lower_bound_cost（最优成本下界）、optimality_gap（相对差距）、optimality_proven（是否已证明最优）、
+      budget_exhausted_without_solution（预算用尽时仍无任何可行方案，区别于无解）
+    cancel_token: CancellationToken，已取消时抛出 SolveCancelled（浏览器中用 PyodideInterruptToken）
+    alternatives: 同一次搜索中收集的备选方案（见 _alternatives_spec）：K 为成本最低的 K 个配置，"pareto" 为
+      (成本, 电池舱总数, 额定功率, 实际功率) 在成本相似窗口内的帕累托前沿，{"top_k": K, "pareto": True} 为两者；
+      结果方案中附加 alternatives = {"top_k": [...], "pareto_front": [...]}，各项含成本、功率、容量、电池舱总数及单元块明细
+    """
+    return default_engine().iter_family(target_dc_family, project_power_mw, project_capacity_mwh, max_device_sets, search_engine, time_budget_ms, cancel_token, alternatives=alternatives)
+
+def _iter_optimal_solution_for_dc_family(engine, target_dc_family, project_power_mw, project_capacity_mwh, max_device_sets, search_engine, time_budget_ms, cancel_token, alternatives=None):
+    """
+    iter_optimal_solution_for_dc_family 的实现，单元块目录及预处理取自 engine（ConfiguratorEngine）；
+    alternatives 为规范化的备选方案参数（见 _DcChoicesSearch）
+    """
+    deadline = _deadline_after(time_budget_ms)
+    if cancel_token is not None:
+        cancel_token.raise_if_cancelled()
     # 计算最小设备套数
-    min_device_sets = calculate_minimum_device_sets(project_power_mw, project_capacity_mwh)
+    min_device_sets = engine.minimum_device_sets(project_power_mw, project_capacity_mwh)
     
     if abs(project_power_mw) < EPSILON and abs(project_capacity_mwh) < EPSILON:
-         return {
+         yield _result_event({
             "cost": 0, "power": 0, "capacity": 0,
             "chosen_global_dc_specs": ["无"], "project_duration_hours": 0, "system_hour_type": 0,
             "message": "项目功率和容量均为0，无需配置。",
             "block_details_for_message": [], "block_details_for_display": [], "dc_family_technology": target_dc_family,
             "min_device_sets": min_device_sets
-        }
+        }, time_budget_ms)
+         return
     if project_power_mw < -EPSILON or project_capacity_mwh < -EPSILON:
-        return {"message": f"基于 {target_dc_family} 直流技术: 项目功率和容量不能为负数。", "cost": float('inf'), "dc_family_technology": target_dc_family, "min_device_sets": min_device_sets}
+        yield _result_event({"message": f"基于 {target_dc_family} 直流技术: 项目功率和容量不能为负数。", "cost": float('inf'), "dc_family_technology": target_dc_family, "min_device_sets": min_device_sets}, time_budget_ms); return
     if abs(project_power_mw) < EPSILON and project_capacity_mwh > EPSILON:
-        return {"message": f"基于 {target_dc_family} 直流技术: 项目功率为0时，容量也必须为0。", "cost": float('inf'), "dc_family_technology": target_dc_family, "min_device_sets": min_device_sets}
+        yield _result_event({"message": f"基于 {target_dc_family} 直流技术: 项目功率为0时，容量也必须为0。", "cost": float('inf'), "dc_family_technology": target_dc_family, "min_device_sets": min_device_sets}, time_budget_ms); return
     if project_power_mw > EPSILON and project_capacity_mwh <= EPSILON:
-        return {"message": f"基于 {target_dc_family} 直流技术: 项目容量必须为正 (当功率大于0时)。", "cost": float('inf'), "dc_family_technology": target_dc_family, "min_device_sets": min_device_sets}
+        yield _result_event({"message": f"基于 {target_dc_family} 直流技术: 项目容量必须为正 (当功率大于0时)。", "cost": float('inf'), "dc_family_technology": target_dc_family, "min_device_sets": min_device_sets}, time_budget_ms); return
 
     duration_hours, system_hour_type = calculate_project_duration_type(project_power_mw, project_capacity_mwh)
     
     # V3.0: 检查是否为1h或8h系统（不支持）
     if system_hour_type == 1 or system_hour_type == 8:
-        return {
+        yield _result_event({
             "message": "暂不支持1或8小时系统",
             "cost": float('inf'),
             "power": 0,
@@ -646,19 +1715,57 @@ def get_optimal_solution_for_dc_family(target_dc_family, project_power_mw, proje
             "chosen_global_dc_specs": [],
             "block_details_for_message": [],
             "block_details_for_display": []
-        }
-    all_candidate_solutions = [] 
-    accumulated_warnings_from_find_best = set()
+        }, time_budget_ms)
+        return
     dc_specs_for_family = [name for name, spec in DC_CONTAINER_SPECS.items() if spec["family"] == target_dc_family]
-    if not dc_specs_for_family: return {"cost": float('inf'), "message": f"基于 {target_dc_family} 直流技术: 未定义该类型的直流电池规格。", "project_duration_hours": duration_hours, "system_hour_type": system_hour_type, "power":0, "capacity":0, "chosen_global_dc_specs":[], "block_details_for_message":[], "user_limit_warning": "", "pcs_config_summary": {}, "total_dc_containers": float('inf')}
+    if not dc_specs_for_family:
+        yield _result_event({"cost": float('inf'), "message": f"基于 {target_dc_family} 直流技术: 未定义该类型的直流电池规格。", "project_duration_hours": duration_hours, "system_hour_type": system_hour_type, "power":0, "capacity":0, "chosen_global_dc_specs":[], "block_details_for_message":[], "user_limit_warning": "", "pcs_config_summary": {}, "total_dc_containers": float('inf')}, time_budget_ms)
+        return
     global_dc_choices = []
     for dc_spec_name in dc_specs_for_family: global_dc_choices.append([dc_spec_name])
     for combo in combinations(dc_specs_for_family, 2): global_dc_choices.append(list(combo))
     if not global_dc_choices and dc_specs_for_family : global_dc_choices.append([dc_specs_for_family[0]])
+    # V3.2: 成本相似阈值改为混合方案（容量比例 + 最小最大限制）
+    unit_price = get_unit_price(system_hour_type, target_dc_family)
+    
+    # 混合方案：基于项目容量的动态阈值，最小0.05MWh，最大0.8MWh
+    threshold_capacity = max(0.05, min(0.8, project_capacity_mwh * 0.001))
+    
+    COST_SIMILARITY_THRESHOLD = threshold_capacity * 100 * unit_price if unit_price else 5.0
+    
+    # 所有全局DC规格选择共用一次组合搜索（各选择的最优方案同时跟踪），结果按原选择顺序参与排序
+    dc_choices = []
     for current_global_dc_names in global_dc_choices:
-        available_ess_blocks = generate_single_ess_block_configs(current_global_dc_names, system_hour_type, duration_hours, target_dc_family)
+        available_ess_blocks = engine.ess_block_catalogue(current_global_dc_names, system_hour_type, target_dc_family)
         if not available_ess_blocks: continue
-        solution_from_find_best = find_best_combination_of_ess_blocks(project_power_mw, project_capacity_mwh, available_ess_blocks, system_hour_type, target_dc_family, max_device_sets)
+        dc_choices.append((current_global_dc_names, available_ess_blocks))
+    search = _DcChoicesSearch(project_power_mw, project_capacity_mwh, dc_choices, system_hour_type, target_dc_family, max_device_sets, search_engine, COST_SIMILARITY_THRESHOLD, deadline, cancel_token, engine, alternatives)
+    build_solution = lambda: _build_family_solution(target_dc_family, project_power_mw, project_capacity_mwh, dc_choices, search.results(), duration_hours, system_hour_type, min_device_sets, COST_SIMILARITY_THRESHOLD)
+    incumbent_entries = None
+    for num_total_sel_blocks, loop_end in search.steps():
+        best_entries = search.best_entries()
+        if best_entries != incumbent_entries:
+            incumbent_entries = best_entries
+            solution = build_solution()
+            if abs(solution["cost"] - float('inf')) > EPSILON:
+                yield {"type": "incumbent", "cost": solution["cost"], "power": solution["power"], "capacity": solution["capacity"],
+                       "total_dc_containers": solution["total_dc_containers"], "blocks_summary": _blocks_summary(solution["blocks_config"]),
+                       "chosen_global_dc_specs": solution["chosen_global_dc_specs"], "solution": solution}
+        yield {"type": "progress", "num_total_sel_blocks": num_total_sel_blocks, "loop_end": loop_end,
+               "dc_choices_live": search.live_count(), "dc_choices_total": len(dc_choices)}
+    solution = build_solution()
+    if search.alternatives is not None:
+        solution["alternatives"] = search.alternatives.results(target_dc_family)
+    yield _result_event(solution, time_budget_ms, search.cost_lower_bound(), not search.interrupted)
+
+def _build_family_solution(target_dc_family, project_power_mw, project_capacity_mwh, dc_choices, solutions_from_find_best, duration_hours, system_hour_type, min_device_sets, COST_SIMILARITY_THRESHOLD):
+    """由各全局DC规格选择的求解结果排序选出该DC家族的最优方案并生成说明"""
+    accumulated_warnings_from_find_best = set()
+    all_candidate_solutions = []
+    dc_choices_skipped_by_bound = []  # 成本下界超出最终排序窗口、提前停止搜索的全局DC规格选择
+    for (current_global_dc_names, _), solution_from_find_best in zip(dc_choices, solutions_from_find_best):
+        if solution_from_find_best.pop("skipped_by_bound", False):
+            dc_choices_skipped_by_bound.append("+".join(current_global_dc_names))
         if abs(solution_from_find_best["cost"] - float('inf')) > EPSILON: 
             solution_from_find_best["pcs_config_summary"] = get_pcs_configuration_summary_map(solution_from_find_best.get("blocks_config"))
             solution_from_find_best["total_dc_containers"] = get_total_physical_dc_containers_count(solution_from_find_best.get("blocks_config")) 
@@ -669,20 +1776,13 @@ def get_optimal_solution_for_dc_family(target_dc_family, project_power_mw, proje
         elif solution_from_find_best.get("user_limit_warning"): accumulated_warnings_from_find_best.add(solution_from_find_best["user_limit_warning"])
     
     overall_best_solution_for_family = {"cost": float('inf'), "message": f"基于 {target_dc_family} 直流技术: 未能找到合适的配置方案。", "project_duration_hours": duration_hours, "system_hour_type": system_hour_type, "power": 0, "capacity": 0, "blocks_config": None, "block_details_for_message": [], "block_details_for_display": [], "chosen_global_dc_specs": [], "user_limit_warning": "", "pcs_config_summary": {}, "total_dc_containers": float('inf'), "min_device_sets": min_device_sets}
+    overall_best_solution_for_family["dc_choices_skipped_by_bound"] = dc_choices_skipped_by_bound
     if not all_candidate_solutions:
         if accumulated_warnings_from_find_best: overall_best_solution_for_family["user_limit_warning"] = " ".join(list(accumulated_warnings_from_find_best)); overall_best_solution_for_family["message"] += f"\n注意: {overall_best_solution_for_family['user_limit_warning']}"
         overall_best_solution_for_family["dc_family_technology"] = target_dc_family
         return overall_best_solution_for_family
     else:
         abs_min_cost = min(s["cost"] for s in all_candidate_solutions)
-        # V3.2: 成本相似阈值改为混合方案（容量比例 + 最小最大限制）
-        unit_price = get_unit_price(system_hour_type, target_dc_family)
-        
-        # 混合方案：基于项目容量的动态阈值，最小0.05MWh，最大0.8MWh
-        threshold_capacity = max(0.05, min(0.8, project_capacity_mwh * 0.001))
-        
-        COST_SIMILARITY_THRESHOLD = threshold_capacity * 100 * unit_price if unit_price else 5.0
-        
         cost_acceptable_solutions = [s for s in all_candidate_solutions if s["cost"] <= abs_min_cost + COST_SIMILARITY_THRESHOLD + EPSILON]
         if not cost_acceptable_solutions: 
             cost_acceptable_solutions = [s for s in all_candidate_solutions if abs(s["cost"] - abs_min_cost) < EPSILON]
@@ -722,6 +1822,7 @@ def get_optimal_solution_for_dc_family(target_dc_family, project_power_mw, proje
             ))
             best_of_the_best = cost_acceptable_solutions[0]
             overall_best_solution_for_family.update(best_of_the_best)
+            overall_best_solution_for_family["dc_choices_skipped_by_bound"] = dc_choices_skipped_by_bound
             overall_best_solution_for_family["chosen_global_dc_specs"] = [DC_CONTAINER_SPECS[name].get("name_cn", name) for name in best_of_the_best.get("chosen_global_dc_specs_raw", [])]
             overall_best_solution_for_family["project_duration_hours"] = duration_hours
             overall_best_solution_for_family["system_hour_type"] = system_hour_type
@@ -832,12 +1933,139 @@ def get_optimal_solution_for_dc_family(target_dc_family, project_power_mw, proje
 
     return overall_best_solution_for_family
 
-def get_overall_optimal_solution(project_power_mw, project_capacity_mwh, max_device_sets=100):
-    # 计算最小设备套数
-    min_device_sets = calculate_minimum_device_sets(project_power_mw, project_capacity_mwh)
-    
-    solution_5mw = get_optimal_solution_for_dc_family("5MW", project_power_mw, project_capacity_mwh, max_device_sets)
-    solution_7_5mw = get_optimal_solution_for_dc_family("7.5MW", project_power_mw, project_capacity_mwh, max_device_sets)
+# V3.3: 两个DC家族的并行求解（仅 CPython；Pyodide 下没有多进程，始终串行）
+# 进程池按工作进程数复用，解释器退出时（或 ConfiguratorEngine.close()）关闭
+DEFAULT_SOLVER_WORKERS = 1
+_SOLVER_EXECUTORS = {}
+
+def _load_spec_tables(dc_container_specs, pcs_specs, unit_price_table):
+    """工作进程初始化：载入主进程创建进程池时的设备规格表（工作进程可能重新导入本模块，或由修改规格表前的主进程派生）"""
+    global DC_CONTAINER_SPECS, PCS_SPECS, UNIT_PRICE_TABLE, ALL_DC_SPEC_KEYS
+    DC_CONTAINER_SPECS, PCS_SPECS, UNIT_PRICE_TABLE = dc_container_specs, pcs_specs, unit_price_table
+    ALL_DC_SPEC_KEYS = list(DC_CONTAINER_SPECS.keys())
+
+def _get_solver_executor(workers, fingerprint):
+    """
+    按 (工作进程数, 设备规格表指纹) 复用的进程池，工作进程启动时载入主进程当前的设备规格表；
+    规格表变化后关闭按旧指纹创建的进程池。无法创建进程池时返回 None
+    """
+    if sys.platform == "emscripten":
+        return None
+    for key in [key for key in _SOLVER_EXECUTORS if key[1] != fingerprint]:
+        _SOLVER_EXECUTORS.pop(key).shutdown(wait=False, cancel_futures=True)
+    executor = _SOLVER_EXECUTORS.get((workers, fingerprint))
+    if executor is None:
+        try:
+            executor = ProcessPoolExecutor(max_workers=workers, initializer=_load_spec_tables, initargs=(DC_CONTAINER_SPECS, PCS_SPECS, UNIT_PRICE_TABLE))
+        except (OSError, NotImplementedError, ImportError):
+            return None
+        _SOLVER_EXECUTORS[(workers, fingerprint)] = executor
+    return executor
+
+def shutdown_solver_executors():
+    """关闭所有求解进程池（取消尚未开始的任务）；之后需要时重新创建"""
+    while _SOLVER_EXECUTORS:
+        _, executor = _SOLVER_EXECUTORS.popitem()
+        executor.shutdown(wait=True, cancel_futures=True)
+
+atexit.register(shutdown_solver_executors)
+
+def _ess_block_catalogue_snapshot(engine, target_dc_family, system_hour_type):
+    """某DC家族、系统时长类型下全部全局DC规格选择的单元块目录（可 pickle，供工作进程直接载入）"""
+    dc_specs_for_family = [name for name, spec in DC_CONTAINER_SPECS.items() if spec["family"] == target_dc_family]
+    global_dc_choices = [[name] for name in dc_specs_for_family] + [list(c) for c in combinations(dc_specs_for_family, 2)]
+    return {_ess_block_catalogue_key(names, system_hour_type, target_dc_family): engine.ess_block_catalogue(names, system_hour_type, target_dc_family)
+            for names in global_dc_choices}
+
+def _remaining_budget_ms(deadline):
+    """截止时刻前剩余的时间预算（毫秒），无截止时刻时为 None"""
+    return None if deadline is None else max(deadline - time.perf_counter(), 0.0) * 1000.0
+
+def _solve_dc_family_worker(catalogue_snapshot, target_dc_family, project_power_mw, project_capacity_mwh, max_device_sets, search_engine, wall_deadline=None, alternatives=None):
+    """
+    工作进程入口：先把主进程传来的单元块目录载入本进程的默认引擎，再求解单个DC家族。
+    wall_deadline 为主进程的截止时刻（time.time() 计时，跨进程可比），换算为本进程开始求解时的剩余预算
+    """
+    engine = default_engine()
+    engine.block_catalogue.update(catalogue_snapshot)
+    time_budget_ms = None if wall_deadline is None else max(wall_deadline - time.time(), 0.0) * 1000.0
+    return engine.solve_family(target_dc_family, project_power_mw, project_capacity_mwh, max_device_sets, search_engine, time_budget_ms, alternatives=alternatives)
+
+def _solve_dc_families(engine, dc_families, project_power_mw, project_capacity_mwh, max_device_sets, search_engine, workers, time_budget_ms=None, cancel_token=None, alternatives=None):
+    """
+    求解各DC家族；workers > 1 时在进程池中并行，进程池不可用时退回串行。
+    各家族共用同一截止时刻：串行时依次取剩余预算，并行时工作进程按该截止时刻（含排队及启动耗时）计算剩余预算。
+    取消令牌无法传入工作进程，给定 cancel_token 时始终串行。
+    """
+    deadline = _deadline_after(time_budget_ms)
+    executor = _get_solver_executor(workers, engine.spec_fingerprint) if workers and workers > 1 and len(dc_families) > 1 and cancel_token is None else None
+    if executor is None:
+        return [engine.solve_family(family, project_power_mw, project_capacity_mwh, max_device_sets, search_engine, _remaining_budget_ms(deadline), cancel_token, alternatives=alternatives)
+                for family in dc_families]
+    system_hour_type = calculate_project_duration_type(project_power_mw, project_capacity_mwh)[1]
+    wall_deadline = None if deadline is None else time.time() + _remaining_budget_ms(deadline) / 1000.0
+    futures = [executor.submit(_solve_dc_family_worker, _ess_block_catalogue_snapshot(engine, family, system_hour_type), family,
+                               project_power_mw, project_capacity_mwh, max_device_sets, search_engine, wall_deadline, alternatives)
+               for family in dc_families]
+    return [future.result() for future in futures]
+
+def get_overall_optimal_solution(project_power_mw, project_capacity_mwh, max_device_sets=100, search_engine=None, workers=None, time_budget_ms=None, cancel_token=None, alternatives=None):
+    # workers: 并行求解两个DC家族的工作进程数（默认 DEFAULT_SOLVER_WORKERS，1 为串行）
+    # time_budget_ms: 搜索时间预算（毫秒），用尽时返回已找到的最优方案及最优性信息（见 get_optimal_solution_for_dc_family）
+    # cancel_token: CancellationToken，已取消时抛出 SolveCancelled
+    # alternatives: 备选方案（见 get_optimal_solution_for_dc_family），两个DC家族的备选合并后附加在结果的 alternatives 中
+    return default_engine().solve_overall(project_power_mw, project_capacity_mwh, max_device_sets, search_engine, workers, time_budget_ms, cancel_token, alternatives)
+
+def _attach_overall_optimality(final_result, solution_5mw, solution_7_5mw):
+    """
+    由两个DC家族的最优性信息得到总体方案的最优性：下界取两者较小值；
+    选中家族已证明最优，且另一家族已证明最优或其下界严格高于选中方案成本时，总体即已证明最优
+    """
+    chosen, other = (solution_7_5mw, solution_5mw) if final_result.get("dc_family_technology") == "7.5MW" else (solution_5mw, solution_7_5mw)
+    cost = final_result.get("total_cost", final_result.get("cost", float('inf')))
+    proven = chosen.get("optimality_proven", True) and (other.get("optimality_proven", True) or _solution_lower_bound(other) > cost + EPSILON)
+    return _attach_optimality(final_result, min(_solution_lower_bound(solution_5mw), _solution_lower_bound(solution_7_5mw)), proven)
+
+def iter_overall_optimal_solution(project_power_mw, project_capacity_mwh, max_device_sets=100, search_engine=None, time_budget_ms=None, cancel_token=None, alternatives=None):
+    """
+    get_overall_optimal_solution 的流式版本（两个DC家族依次求解），依次产出事件字典：
+      {"type": "incumbent", "dc_family", "solution"}  当前总体最优方案变化（solution 格式同 get_overall_optimal_solution 返回值）
+      {"type": "progress", "dc_family", ...}          某DC家族完成一个总块数（其余字段同 iter_optimal_solution_for_dc_family）
+      {"type": "result", "solution"}                  最后一个事件，solution 即 get_overall_optimal_solution 的返回值
+    """
+    return default_engine().iter_overall(project_power_mw, project_capacity_mwh, max_device_sets, search_engine, time_budget_ms, cancel_token, alternatives)
+
+def _iter_overall_optimal_solution(engine, project_power_mw, project_capacity_mwh, max_device_sets, search_engine, time_budget_ms, cancel_token, alternatives=None):
+    """iter_overall_optimal_solution 的实现（两个DC家族均由 engine 求解）"""
+    deadline = _deadline_after(time_budget_ms)
+    min_device_sets = engine.minimum_device_sets(project_power_mw, project_capacity_mwh)
+    not_solved = {"cost": float('inf'), "message": ""}
+    family_solutions = {}
+    incumbent = None
+    for dc_family in ("5MW", "7.5MW"):
+        for event in engine.iter_family(dc_family, project_power_mw, project_capacity_mwh, max_device_sets, search_engine, _remaining_budget_ms(deadline), cancel_token, alternatives=alternatives):
+            if event["type"] == "result":
+                family_solutions[dc_family] = event["solution"]
+            elif event["type"] == "incumbent":
+                current = dict(family_solutions, **{dc_family: event["solution"]})
+                overall = combine_dc_family_solutions(project_power_mw, project_capacity_mwh, current.get("5MW", not_solved), current.get("7.5MW", not_solved), min_device_sets)
+                if overall != incumbent:
+                    incumbent = overall
+                    yield {"type": "incumbent", "dc_family": dc_family, "solution": overall}
+            else:
+                yield dict(event, dc_family=dc_family)
+    final_result = combine_dc_family_solutions(project_power_mw, project_capacity_mwh, family_solutions["5MW"], family_solutions["7.5MW"], min_device_sets)
+    if time_budget_ms is not None:
+        _attach_overall_optimality(final_result, family_solutions["5MW"], family_solutions["7.5MW"])
+    yield {"type": "result", "solution": final_result}
+
+def combine_dc_family_solutions(project_power_mw, project_capacity_mwh, solution_5mw, solution_7_5mw, min_device_sets=None):
+    """
+    由两个DC家族各自的求解结果得到总体最优方案（费用更低者，相同时取5MW）。
+    浏览器端两个家族分别在不同的 Web Worker 中求解后，也调用此函数合并结果。
+    """
+    if min_device_sets is None:
+        min_device_sets = calculate_minimum_device_sets(project_power_mw, project_capacity_mwh)
 
     cost_5mw = solution_5mw.get("cost", float('inf'))
     cost_7_5mw = solution_7_5mw.get("cost", float('inf'))
@@ -885,24 +2113,588 @@ def get_overall_optimal_solution(project_power_mw, project_capacity_mwh, max_dev
         "dc_family_technology": chosen_solution.get("dc_family_technology", "未知"),
         "min_device_sets": min_device_sets
     }
+    family_alternatives = [s["alternatives"] for s in (solution_5mw, solution_7_5mw) if "alternatives" in s]
+    if family_alternatives:
+        final_result["alternatives"] = _merge_alternatives(family_alternatives)
     return final_result
 
+# V3.3: 会话级配置引擎
+# 单元块目录、共享搜索的单元块表预处理（含分支定界用的类型组合汇总参数）等只取决于设备规格表，
+# 由引擎在多次求解间复用；页面 Worker 与批处理任务各保持一个引擎即可。模块级求解函数使用默认引擎。
+# 求解结果按规范化输入缓存（LRU）；设备规格表被修改时（指纹变化）引擎自动清空全部缓存。
+DEFAULT_SEARCH_PLAN_CACHE_SIZE = 64
+SWEEP_FAMILIES = ("5MW", "7.5MW")  # 参数扫描结果中 family_index 对应的DC家族
+DEFAULT_RESULT_CACHE_SIZE = 256
+RESULT_CACHE_INPUT_DIGITS = 9  # 缓存键中功率/容量保留的小数位数（与 EPSILON = 1e-9 一致）
+_DEFAULT_ENGINE = None
+
+def spec_fingerprint():
+    """DC_CONTAINER_SPECS / PCS_SPECS / UNIT_PRICE_TABLE 的内容指纹（SHA-256 前16位十六进制）"""
+    specs = {"dc_container_specs": DC_CONTAINER_SPECS, "pcs_specs": PCS_SPECS,
+             "unit_price_table": {str(h): prices for h, prices in UNIT_PRICE_TABLE.items()}}
+    return hashlib.sha256(json.dumps(specs, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()[:16]
+
+def _normalise_solver_input(value):
+    """功率/容量按 RESULT_CACHE_INPUT_DIGITS 取整（并把 -0.0 归为 0.0），相差不足 EPSILON 的输入共用缓存条目"""
+    value = round(float(value), RESULT_CACHE_INPUT_DIGITS)
+    return value if value != 0 else 0.0
+
+class ConfiguratorEngine:
+    """
+    配置求解引擎：持有设备规格表、单元块目录、共享搜索预处理及求解结果的 LRU 缓存和性能计数器。
+    每次求解前核对设备规格表（DC_CONTAINER_SPECS / PCS_SPECS / UNIT_PRICE_TABLE）的指纹，变化时清空全部缓存。
+    result_cache_size 为 0 时不在内存中缓存求解结果；attach_persistent_cache() 可再挂接跨进程/页面的持久化缓存，
+    attach_solution_table() 挂接离线预计算的答案表（总体最优方案）。
+    求解结果只取决于本次输入：当前最优按原遍历顺序逐个比较决定，上一次求解的方案给不出有效的剪枝阈值，引擎不保留上一次求解的状态。
+    """
+    def __init__(self, search_engine=None, workers=None, search_plan_cache_size=DEFAULT_SEARCH_PLAN_CACHE_SIZE, result_cache_size=DEFAULT_RESULT_CACHE_SIZE):
+        self.search_engine = search_engine  # 默认组合搜索引擎（None 时为 DEFAULT_SEARCH_ENGINE）
+        self.workers = workers  # 默认工作进程数（None 时为 DEFAULT_SOLVER_WORKERS）
+        self.search_plan_cache_size = search_plan_cache_size
+        self.result_cache_size = result_cache_size
+        self.block_catalogue = {}
+        self._search_plans = OrderedDict()
+        self._results = OrderedDict()
+        self.persistent_cache = None
+        self.solution_table = None
+        self.reset_counters()
+        self.clear_caches()
+
+    def reset_counters(self):
+        self.counters = dict.fromkeys(("family_solves", "overall_solves", "catalogue_hits", "catalogue_misses",
+                                       "search_plan_hits", "search_plan_misses", "search_plan_evictions",
+                                       "result_hits", "result_misses", "result_evictions", "spec_invalidations",
+                                       "persistent_hits", "persistent_misses", "persistent_evictions", "table_hits"), 0)
+        self.counters["family_solve_seconds"] = 0.0
+
+    def clear_caches(self):
+        """清空单元块目录、预处理及结果缓存，并按当前设备规格表重新计算指纹与最小设备套数所用的单块上限"""
+        self.dc_container_specs = DC_CONTAINER_SPECS
+        self.pcs_specs = PCS_SPECS
+        self.unit_price_table = UNIT_PRICE_TABLE
+        self.spec_fingerprint = spec_fingerprint()
+        self.block_catalogue.clear()
+        self._search_plans.clear()
+        self._results.clear()
+        self._max_single_block_power = max(spec["power_mw"] for spec in self.pcs_specs.values())
+        self._max_single_block_capacity = max(spec["capacity_mwh"] for spec in self.dc_container_specs.values())
+        if self.persistent_cache is not None:
+            self.persistent_cache.set_version(self.spec_fingerprint)
+
+    def check_specs(self):
+        """设备规格表被修改或替换时清空全部缓存；返回当前指纹"""
+        fingerprint = spec_fingerprint()
+        if fingerprint != self.spec_fingerprint:
+            self.counters["spec_invalidations"] += 1
+            self.clear_caches()
+        return self.spec_fingerprint
+
+    def stats(self):
+        """计数器快照，另含各缓存的当前条目数"""
+        return dict(self.counters, catalogue_entries=len(self.block_catalogue), search_plan_entries=len(self._search_plans),
+                    result_entries=len(self._results))
+
+    def _cached_result(self, key, solve):
+        """
+        结果缓存：先查预计算答案表（若已挂接），再查内存 LRU（命中时返回缓存方案的深拷贝），然后查持久化缓存（若已挂接），
+        仍未命中则调用 solve() 求解并写入后两级缓存（超出容量时淘汰最久未用的条目）。调用方修改返回的字典不会影响缓存。
+        solve 为 None 时只查缓存，未命中返回 None。
+        """
+        if self.result_cache_size <= 0 and self.persistent_cache is None and self.solution_table is None:
+            return solve() if solve is not None else None
+        key = (self.check_specs(),) + key
+        if self.solution_table is not None:
+            solution = self.solution_table.lookup(key)
+            if solution is not None:
+                self.counters["table_hits"] += 1
+                return solution
+        cached = self._results.get(key)
+        if cached is not None:
+            self.counters["result_hits"] += 1
+            self._results.move_to_end(key)
+            return copy.deepcopy(cached)
+        self.counters["result_misses"] += 1
+        solution = None
+        if self.persistent_cache is not None:
+            solution = self.persistent_cache.get(key)
+            self.counters["persistent_hits" if solution is not None else "persistent_misses"] += 1
+        if solution is None:
+            if solve is None:
+                return None
+            solution = solve()
+            if self.persistent_cache is not None:
+                self.counters["persistent_evictions"] += self.persistent_cache.put(key, solution)
+        if self.result_cache_size > 0:
+            self._results[key] = copy.deepcopy(solution)
+            while len(self._results) > self.result_cache_size:
+                self._results.popitem(last=False)
+                self.counters["result_evictions"] += 1
+        return solution
+
+    def attach_solution_table(self, solution_table):
+        """挂接预计算答案表（SolutionTable，None 为取消挂接）；仅与当前设备规格指纹及搜索引擎一致的表会被查询"""
+        self.solution_table = solution_table
+
+    def close(self):
+        """关闭挂接的持久化结果缓存及求解进程池（进程池为各引擎共用，之后求解时重新创建）"""
+        if self.persistent_cache is not None:
+            self.persistent_cache.close()
+            self.persistent_cache = None
+        shutdown_solver_executors()
+
+    def attach_persistent_cache(self, persistent_cache):
+        """挂接持久化结果缓存（PersistentResultCache，None 为取消挂接），并清除其中其他版本的条目"""
+        self.persistent_cache = persistent_cache
+        if persistent_cache is not None:
+            persistent_cache.set_version(self.check_specs())
+
+    def _result_key(self, target_dc_family, project_power_mw, project_capacity_mwh, max_device_sets, search_engine, alternatives=None):
+        """结果缓存键；收集备选方案时另附规范化的备选方案参数（此类结果不会命中答案表）"""
+        key = (target_dc_family, _normalise_solver_input(project_power_mw), _normalise_solver_input(project_capacity_mwh),
+               int(max_device_sets), search_engine or self.search_engine or DEFAULT_SEARCH_ENGINE)
+        spec = _alternatives_spec(alternatives)
+        return key if spec is None else key + (spec,)
+
+    def ess_block_catalogue(self, global_dc_spec_names, system_hour_type, target_dc_family_filter):
+        """返回 (全局DC规格集合, 系统时长类型, DC家族) 对应的单元块元组（首次使用时生成）"""
+        key = _ess_block_catalogue_key(global_dc_spec_names, system_hour_type, target_dc_family_filter)
+        blocks = self.block_catalogue.get(key)
+        if blocks is None:
+            self.counters["catalogue_misses"] += 1
+            blocks = tuple(generate_single_ess_block_configs(list(key[0]), system_hour_type, None, target_dc_family_filter))
+            self.block_catalogue[key] = blocks
+        else:
+            self.counters["catalogue_hits"] += 1
+        return blocks
+
+    def shared_search_plan(self, choice_names, choice_blocks, system_hour_type, unit_price):
+        """_plan_shared_search 的 LRU 缓存版本，按参与共享搜索的全局DC规格选择缓存"""
+        key = (tuple(tuple(sorted(names)) for names in choice_names), system_hour_type, unit_price)
+        plan = self._search_plans.get(key)
+        if plan is not None:
+            self.counters["search_plan_hits"] += 1
+            self._search_plans.move_to_end(key)
+            return plan
+        self.counters["search_plan_misses"] += 1
+        plan = _plan_shared_search(choice_blocks, system_hour_type, unit_price)
+        self._search_plans[key] = plan
+        while len(self._search_plans) > self.search_plan_cache_size:
+            self._search_plans.popitem(last=False)
+            self.counters["search_plan_evictions"] += 1
+        return plan
+
+    def minimum_device_sets(self, project_power_mw, project_capacity_mwh):
+        """计算满足项目需求的最小设备套数"""
+        if project_power_mw <= EPSILON or project_capacity_mwh <= EPSILON:
+            return 0
+        # 按最大功率、最大容量的单个设备块计算最少需要的套数
+        min_sets_for_power = math.ceil(project_power_mw / self._max_single_block_power)
+        duration_hours, system_hour_type = calculate_project_duration_type(project_power_mw, project_capacity_mwh)
+        max_capacity_per_block = self._max_single_block_capacity * system_hour_type
+        min_sets_for_capacity = math.ceil(project_capacity_mwh / max_capacity_per_block)
+        return max(min_sets_for_power, min_sets_for_capacity, 1)
+
+    def iter_family(self, target_dc_family, project_power_mw, project_capacity_mwh, max_device_sets=100, search_engine=None, time_budget_ms=None, cancel_token=None, alternatives=None):
+        """见 iter_optimal_solution_for_dc_family"""
+        self.check_specs()
+        return _iter_optimal_solution_for_dc_family(self, target_dc_family, project_power_mw, project_capacity_mwh, max_device_sets,
+                                                    search_engine or self.search_engine, time_budget_ms, cancel_token, _alternatives_spec(alternatives))
+
+    def solve_family(self, target_dc_family, project_power_mw, project_capacity_mwh, max_device_sets=100, search_engine=None, time_budget_ms=None, cancel_token=None, alternatives=None):
+        """见 get_optimal_solution_for_dc_family；不限时间预算的求解结果经结果缓存"""
+        if time_budget_ms is not None:
+            return self._solve_family(target_dc_family, project_power_mw, project_capacity_mwh, max_device_sets, search_engine, time_budget_ms, cancel_token, alternatives)
+        return self._cached_result(self._result_key(target_dc_family, project_power_mw, project_capacity_mwh, max_device_sets, search_engine, alternatives),
+                                       lambda: self._solve_family(target_dc_family, project_power_mw, project_capacity_mwh, max_device_sets, search_engine, None, cancel_token, alternatives))
+
+    def _solve_family(self, target_dc_family, project_power_mw, project_capacity_mwh, max_device_sets, search_engine, time_budget_ms, cancel_token, alternatives=None):
+        start = time.perf_counter()
+        try:
+            return _final_solution(self.iter_family(target_dc_family, project_power_mw, project_capacity_mwh, max_device_sets, search_engine, time_budget_ms, cancel_token, alternatives))
+        finally:
+            self.counters["family_solves"] += 1
+            self.counters["family_solve_seconds"] += time.perf_counter() - start
+
+    def iter_overall(self, project_power_mw, project_capacity_mwh, max_device_sets=100, search_engine=None, time_budget_ms=None, cancel_token=None, alternatives=None):
+        """见 iter_overall_optimal_solution"""
+        self.check_specs()
+        return _iter_overall_optimal_solution(self, project_power_mw, project_capacity_mwh, max_device_sets, search_engine or self.search_engine, time_budget_ms, cancel_token, alternatives)
+
+    def solve_overall(self, project_power_mw, project_capacity_mwh, max_device_sets=100, search_engine=None, workers=None, time_budget_ms=None, cancel_token=None, alternatives=None):
+        """见 get_overall_optimal_solution；不限时间预算的求解结果经结果缓存"""
+        if time_budget_ms is not None:
+            return self._solve_overall(project_power_mw, project_capacity_mwh, max_device_sets, search_engine, workers, time_budget_ms, cancel_token, alternatives)
+        return self._cached_result(self._result_key(None, project_power_mw, project_capacity_mwh, max_device_sets, search_engine, alternatives),
+                                   lambda: self._solve_overall(project_power_mw, project_capacity_mwh, max_device_sets, search_engine, workers, None, cancel_token, alternatives))
+
+    def _solve_overall(self, project_power_mw, project_capacity_mwh, max_device_sets, search_engine, workers, time_budget_ms, cancel_token, alternatives=None):
+        self.check_specs()
+        self.counters["overall_solves"] += 1
+        min_device_sets = self.minimum_device_sets(project_power_mw, project_capacity_mwh)
+        if workers is None:
+            workers = DEFAULT_SOLVER_WORKERS if self.workers is None else self.workers
+        solution_5mw, solution_7_5mw = _solve_dc_families(self, ["5MW", "7.5MW"], project_power_mw, project_capacity_mwh, max_device_sets,
+                                                          search_engine or self.search_engine, workers, time_budget_ms, cancel_token, alternatives)
+        final_result = combine_dc_family_solutions(project_power_mw, project_capacity_mwh, solution_5mw, solution_7_5mw, min_device_sets)
+        if time_budget_ms is not None:
+            _attach_overall_optimality(final_result, solution_5mw, solution_7_5mw)
+        return final_result
+
+    def lookup_overall(self, project_power_mw, project_capacity_mwh, max_device_sets=100, search_engine=None):
+        """只查答案表及结果缓存的总体最优方案，未命中时返回 None（不求解）"""
+        return self._cached_result(self._result_key(None, project_power_mw, project_capacity_mwh, max_device_sets, search_engine), None)
+
+    def solve_many(self, projects, family=None, max_device_sets=100, search_engine=None, workers=None):
+        """
+        批量求解多个项目：projects 为 (项目功率MW, 项目容量MWh) 或 (项目功率MW, 项目容量MWh, 设备套数上限) 的序列；
+        family 为 None 时求解总体最优方案，否则只求解该DC家族。
+        项目按系统时长类型分组（NumPy 批量判定），每组先一次生成所需的单元块目录，组内按功率、容量排序后依次求解，
+        相邻项目共用单元块表预处理及类型组合汇总参数；规范化后相同的输入只求解一次。
+        workers > 1 时（仅 CPython）未命中缓存的项目分批交给进程池，结果写回本引擎的缓存。
+        返回与输入同序的 [{"solution", "seconds", "system_hour_type"}, ...]，seconds 为该项目的求解用时；
+        重复输入的条目另含 "duplicate_of"（首次出现的下标），seconds 为 0。
+        """
+        points = [(project[0], project[1], project[2] if len(project) > 2 else max_device_sets) for project in projects]
+        if not points:
+            return []
+        hour_types = _system_hour_types(np.array([p[0] for p in points], dtype=float), np.array([p[1] for p in points], dtype=float))
+        dc_families = ["5MW", "7.5MW"] if family is None else [family]
+        first_index = {}
+        duplicates = []
+        groups = {}
+        for i, point in enumerate(points):
+            key = _solution_table_key(*point)
+            if key in first_index:
+                duplicates.append((i, first_index[key]))
+            else:
+                first_index[key] = i
+                groups.setdefault(int(hour_types[i]), []).append(i)
+
+        results = [None] * len(points)
+        executor = _get_solver_executor(workers, self.check_specs()) if workers and workers > 1 else None
+        futures = []
+        for system_hour_type, indices in sorted(groups.items()):
+            indices.sort(key=lambda i: points[i])
+            snapshot = {}
+            if system_hour_type in UNIT_PRICE_TABLE:
+                for dc_family in dc_families:
+                    snapshot.update(_ess_block_catalogue_snapshot(self, dc_family, system_hour_type))
+            if executor is None:
+                for i in indices:
+                    start = time.perf_counter()
+                    solution = self.solve(points[i][0], points[i][1], family, points[i][2], search_engine)
+                    results[i] = {"solution": solution, "seconds": time.perf_counter() - start, "system_hour_type": system_hour_type}
+                continue
+            pending = []
+            for i in indices:
+                start = time.perf_counter()
+                solution = self._cached_result(self._result_key(family, points[i][0], points[i][1], points[i][2], search_engine), None)
+                if solution is None:
+                    pending.append(i)
+                else:
+                    results[i] = {"solution": solution, "seconds": time.perf_counter() - start, "system_hour_type": system_hour_type}
+            chunk_size = max(1, math.ceil(len(pending) / (workers * 4)))
+            for c in range(0, len(pending), chunk_size):
+                chunk = pending[c:c + chunk_size]
+                futures.append((chunk, system_hour_type, executor.submit(_solve_many_worker, snapshot, [points[i] for i in chunk], family, search_engine)))
+        for chunk, system_hour_type, future in futures:
+            for i, (solution, seconds) in zip(chunk, future.result()):
+                self._cached_result(self._result_key(family, points[i][0], points[i][1], points[i][2], search_engine), lambda: solution)
+                results[i] = {"solution": solution, "seconds": seconds, "system_hour_type": system_hour_type}
+        for i, first in duplicates:
+            results[i] = {"solution": copy.deepcopy(results[first]["solution"]), "seconds": 0.0,
+                          "system_hour_type": results[first]["system_hour_type"], "duplicate_of": first}
+        return results
+
+    def sweep(self, project_powers_mw, column_values, max_device_sets=100, search_engine=None, by_duration=False):
+        """
+        参数扫描：项目功率 × 项目容量（by_duration=True 时 column_values 为系统时长h，容量 = 功率 × 时长）网格上各点的总体最优方案，
+        返回形状为 (功率数, 列数) 的 NumPy 矩阵：
+          {"project_power_mw", "project_capacity_mwh"  各网格点的输入,
+           "cost", "power", "capacity", "dc_count"     总成本（万元）、额定功率、直流容量、电池舱总数,
+           "family_index", "min_device_sets", "families"  选中DC家族在 families（SWEEP_FAMILIES）中的下标及最小设备套数}
+        无可行方案的网格点 cost 为 inf，power/capacity/dc_count 为 0，family_index 为 -1。
+        这是网格上的便捷封装：各网格点依次独立求解，只共用单元块目录、预处理及结果缓存。
+        相邻网格点之间不复用阈值或总块数下界——当前最优按原遍历顺序逐个比较决定、搜索中可能上升，相邻点的方案给不出有效的剪枝界。
+        各网格点的结果与 solve_overall 相同，并写入结果缓存。
+        """
+        powers = np.asarray(project_powers_mw, dtype=float).reshape(-1)
+        columns = np.asarray(column_values, dtype=float).reshape(-1)
+        project_power = np.repeat(powers[:, None], len(columns), axis=1)
+        project_capacity = project_power * columns[None, :] if by_duration else np.repeat(columns[None, :], len(powers), axis=0)
+        shape = project_power.shape
+        sweep = {"project_power_mw": project_power, "project_capacity_mwh": project_capacity,
+                 "cost": np.full(shape, np.inf), "power": np.zeros(shape), "capacity": np.zeros(shape),
+                 "dc_count": np.zeros(shape, dtype=int), "family_index": np.full(shape, -1, dtype=int),
+                 "min_device_sets": np.zeros(shape, dtype=int), "families": SWEEP_FAMILIES}
+        for i in range(shape[0]):
+            for j in range(shape[1]):
+                project_power_mw, project_capacity_mwh = float(project_power[i, j]), float(project_capacity[i, j])
+                family_solutions = {dc_family: self.solve_family(dc_family, project_power_mw, project_capacity_mwh, max_device_sets, search_engine)
+                                    for dc_family in SWEEP_FAMILIES}
+                overall = self._cached_result(self._result_key(None, project_power_mw, project_capacity_mwh, max_device_sets, search_engine),
+                                              lambda: self._combine_families(project_power_mw, project_capacity_mwh, family_solutions))
+                sweep["min_device_sets"][i, j] = overall.get("min_device_sets", 0)
+                if overall.get("dc_family_technology") in family_solutions:
+                    dc_family = overall["dc_family_technology"]
+                    sweep["cost"][i, j] = overall["total_cost"]
+                    sweep["power"][i, j] = overall["power"]
+                    sweep["capacity"][i, j] = overall["capacity"]
+                    sweep["dc_count"][i, j] = family_solutions[dc_family].get("total_dc_containers", 0)
+                    sweep["family_index"][i, j] = SWEEP_FAMILIES.index(dc_family)
+        return sweep
+
+    def _combine_families(self, project_power_mw, project_capacity_mwh, family_solutions):
+        """由已求得的两个DC家族方案得到总体最优方案（与 _solve_overall 不限时间预算时的结果相同）"""
+        self.counters["overall_solves"] += 1
+        return combine_dc_family_solutions(project_power_mw, project_capacity_mwh, family_solutions["5MW"], family_solutions["7.5MW"],
+                                           self.minimum_device_sets(project_power_mw, project_capacity_mwh))
+
+    def solve(self, project_power_mw, project_capacity_mwh, family=None, max_device_sets=100, search_engine=None, time_budget_ms=None, cancel_token=None):
+        """family 为 None 时求解总体最优方案，否则求解该DC家族（"5MW" / "7.5MW"）的最优方案"""
+        if family is None:
+            return self.solve_overall(project_power_mw, project_capacity_mwh, max_device_sets, search_engine, None, time_budget_ms, cancel_token)
+        return self.solve_family(family, project_power_mw, project_capacity_mwh, max_device_sets, search_engine, time_budget_ms, cancel_token)
+
+def default_engine():
+    """模块级求解函数共用的引擎（首次使用时创建）"""
+    global _DEFAULT_ENGINE
+    if _DEFAULT_ENGINE is None:
+        _DEFAULT_ENGINE = ConfiguratorEngine()
+    return _DEFAULT_ENGINE
+
+# V3.3: 持久化结果缓存（sqlite）
+# CPython 下为本地文件；浏览器中 Worker 把 IDBFS 挂载到 /solver_cache_<序号> 并在求解后同步到 IndexedDB（见 solver_worker.js）。
+# 条目按 (代码版本, 单元块目录版本, 设备规格指纹) 分版本，切换版本时删除其他版本的条目；条目数超过上限时淘汰最久未用的条目。
+# 缓存读写出错（文件损坏、被其他进程锁定等）时按未命中处理，不影响求解。
+RESULT_CACHE_CODE_VERSION = 2  # 求解逻辑或方案格式变化时递增，使已持久化的结果失效
+DEFAULT_PERSISTENT_CACHE_ENTRIES = 5000
+
+class PersistentResultCache:
+    """
+    sqlite 文件中的求解结果缓存，方案以 JSON 保存（与预计算答案表相同：元组读回为列表，inf 保存为 Infinity）。
+    缓存文件可能来自其他进程或页面，读取时只做 JSON 解析，不执行反序列化代码
+    """
+    def __init__(self, path, max_entries=DEFAULT_PERSISTENT_CACHE_ENTRIES):
+        import sqlite3  # Pyodide 中需先 loadPackage("sqlite3")
+        self._errors = (sqlite3.Error, ValueError, TypeError)
+        self.path = path
+        self.max_entries = max_entries
+        self.version = None
+        self.connection = sqlite3.connect(path, timeout=5.0, isolation_level=None)
+        self.connection.execute("CREATE TABLE IF NOT EXISTS solver_results ("
+                                "key TEXT PRIMARY KEY, version TEXT NOT NULL, solution TEXT NOT NULL, last_used REAL NOT NULL)")
+
+    def set_version(self, spec_fingerprint):
+        """切换到给定设备规格指纹对应的版本，删除其他版本的条目"""
+        self.version = f"{RESULT_CACHE_CODE_VERSION}:{ESS_BLOCK_CATALOGUE_VERSION}:{spec_fingerprint}"
+        try:
+            self.connection.execute("DELETE FROM solver_results WHERE version != ?", (self.version,))
+        except self._errors:
+            pass
+
+    @staticmethod
+    def _key_text(key):
+        return json.dumps(list(key), ensure_ascii=False)
+
+    def get(self, key):
+        """返回缓存的方案（新对象），未命中或读取出错时返回 None"""
+        key_text = self._key_text(key)
+        try:
+            row = self.connection.execute("SELECT solution FROM solver_results WHERE key = ? AND version = ?", (key_text, self.version)).fetchone()
+            if row is None:
+                return None
+            self.connection.execute("UPDATE solver_results SET last_used = ? WHERE key = ?", (time.time(), key_text))
+            return json.loads(row[0])
+        except self._errors:
+            return None
+
+    def put(self, key, solution):
+        """写入方案，返回因超出条目上限而淘汰的条目数"""
+        try:
+            self.connection.execute("INSERT OR REPLACE INTO solver_results VALUES (?, ?, ?, ?)",
+                                    (self._key_text(key), self.version, json.dumps(solution, ensure_ascii=False, separators=(",", ":")), time.time()))
+            excess = self.connection.execute("SELECT COUNT(*) FROM solver_results").fetchone()[0] - self.max_entries
+            if excess > 0:
+                self.connection.execute("DELETE FROM solver_results WHERE key IN "
+                                        "(SELECT key FROM solver_results ORDER BY last_used LIMIT ?)", (excess,))
+                return excess
+        except self._errors:
+            pass
+        return 0
+
+    def __len__(self):
+        """条目数，读取出错时为 0"""
+        try:
+            return self.connection.execute("SELECT COUNT(*) FROM solver_results").fetchone()[0]
+        except self._errors:
+            return 0
+
+    def clear(self):
+        try:
+            self.connection.execute("DELETE FROM solver_results")
+        except self._errors:
+            pass
+
+    def close(self):
+        self.connection.close()
+
+def enable_persistent_result_cache(path, max_entries=DEFAULT_PERSISTENT_CACHE_ENTRIES):
+    """为默认引擎挂接持久化结果缓存，返回该缓存；无法打开（如缺少 sqlite3）时抛出 ImportError 或 sqlite3.Error"""
+    cache = PersistentResultCache(path, max_entries)
+    default_engine().attach_persistent_cache(cache)
+    return cache
+
+# V3.3: 预计算答案表
+# 离线对常用输入网格（整数MW功率 × 2h/4h/6h 等）求解总体最优方案并写入一个文件（见 build_solution_table.py），
+# 运行时网格内的输入直接查表，其余输入仍走求解器。文件结构（小端序）：
+#   魔数 | 头部长度(u32) | 头部JSON | zlib 预置字典 | 索引（每条：功率 f64, 容量 f64, 设备套数上限 i32, 数据偏移 u64, 数据长度 u32）| 数据
+# 各方案为 JSON，以共享预置字典单独 zlib 压缩，查表时只解压命中的条目；CPython 下整个文件以 mmap 只读映射，
+# 浏览器中 Worker 把静态文件 solution_table.bin 取回写入 Pyodide 文件系统后载入（见 solver_worker.js）。
+SOLUTION_TABLE_MAGIC = b"ESSSOLT1"
+SOLUTION_TABLE_VERSION = 1
+SOLUTION_TABLE_ZDICT_SIZE = 32 * 1024
+_SOLUTION_TABLE_HEADER_LENGTH = struct.Struct("<I")
+_SOLUTION_TABLE_INDEX_ENTRY = struct.Struct("<ddiQI")
+
+def _solution_table_key(project_power_mw, project_capacity_mwh, max_device_sets):
+    return (_normalise_solver_input(project_power_mw), _normalise_solver_input(project_capacity_mwh), int(max_device_sets))
+
+def build_solution_table(path, grid, search_engine=None, workers=None, progress=None):
+    """
+    对 grid 中每个 (项目功率MW, 项目容量MWh, 设备套数上限) 用默认引擎求解总体最优方案并写入答案表文件，返回条目数。
+    progress(已完成数, 总数) 为可选的进度回调。
+    """
+    engine = default_engine()
+    keys = sorted(set(_solution_table_key(*point) for point in grid))
+    payloads = []
+    for done, (project_power_mw, project_capacity_mwh, max_device_sets) in enumerate(keys, 1):
+        solution = engine.solve_overall(project_power_mw, project_capacity_mwh, max_device_sets, search_engine, workers)
+        payloads.append(json.dumps(solution, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+        if progress is not None:
+            progress(done, len(keys))
+    # 预置字典取自前若干条方案：各方案的字段名、说明文字高度重复，单条压缩也能得到较高压缩率
+    zdict = b"".join(payloads[:64])[-SOLUTION_TABLE_ZDICT_SIZE:]
+    compressed = []
+    for payload in payloads:
+        compressor = zlib.compressobj(9, zdict=zdict) if zdict else zlib.compressobj(9)
+        compressed.append(compressor.compress(payload) + compressor.flush())
+    header = json.dumps({
+        "version": SOLUTION_TABLE_VERSION, "code_version": RESULT_CACHE_CODE_VERSION, "catalogue_version": ESS_BLOCK_CATALOGUE_VERSION,
+        "spec_fingerprint": engine.check_specs(), "search_engine": search_engine or engine.search_engine or DEFAULT_SEARCH_ENGINE,
+        "count": len(keys), "zdict_length": len(zdict)
+    }).encode("utf-8")
+    offset = len(SOLUTION_TABLE_MAGIC) + _SOLUTION_TABLE_HEADER_LENGTH.size + len(header) + len(zdict) + _SOLUTION_TABLE_INDEX_ENTRY.size * len(keys)
+    with open(path, "wb") as f:
+        f.write(SOLUTION_TABLE_MAGIC + _SOLUTION_TABLE_HEADER_LENGTH.pack(len(header)) + header + zdict)
+        for (project_power_mw, project_capacity_mwh, max_device_sets), data in zip(keys, compressed):
+            f.write(_SOLUTION_TABLE_INDEX_ENTRY.pack(project_power_mw, project_capacity_mwh, max_device_sets, offset, len(data)))
+            offset += len(data)
+        for data in compressed:
+            f.write(data)
+    return len(keys)
+
+class SolutionTable:
+    """
+    只读的预计算答案表（build_solution_table 生成）。
+    载入时校验格式版本、代码版本、单元块目录版本及设备规格指纹，不一致时抛出 ValueError；
+    get() / lookup() 每次返回新解压的方案字典，调用方可随意修改。
+    """
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            try:
+                import mmap
+                self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except (ImportError, OSError, ValueError):
+                self._data = f.read()  # 无 mmap 的环境（如部分 Pyodide 文件系统）整体读入
+        data = self._data
+        if data[:len(SOLUTION_TABLE_MAGIC)] != SOLUTION_TABLE_MAGIC:
+            raise ValueError("不是有效的预计算答案表文件")
+        pos = len(SOLUTION_TABLE_MAGIC)
+        header_length, = _SOLUTION_TABLE_HEADER_LENGTH.unpack_from(data, pos)
+        pos += _SOLUTION_TABLE_HEADER_LENGTH.size
+        self.header = json.loads(bytes(data[pos:pos + header_length]).decode("utf-8"))
+        pos += header_length
+        if (self.header.get("version") != SOLUTION_TABLE_VERSION or self.header.get("code_version") != RESULT_CACHE_CODE_VERSION
+                or self.header.get("catalogue_version") != ESS_BLOCK_CATALOGUE_VERSION or self.header.get("spec_fingerprint") != spec_fingerprint()):
+            raise ValueError("预计算答案表与当前版本的求解器或设备规格不一致，请重新生成")
+        self.spec_fingerprint = self.header["spec_fingerprint"]
+        self.search_engine = self.header["search_engine"]
+        self._zdict = bytes(data[pos:pos + self.header["zdict_length"]])
+        pos += self.header["zdict_length"]
+        self._index = {}
+        for i in range(self.header["count"]):
+            project_power_mw, project_capacity_mwh, max_device_sets, offset, length = _SOLUTION_TABLE_INDEX_ENTRY.unpack_from(data, pos + i * _SOLUTION_TABLE_INDEX_ENTRY.size)
+            self._index[(project_power_mw, project_capacity_mwh, max_device_sets)] = (offset, length)
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, point):
+        return _solution_table_key(*point) in self._index
+
+    def _load(self, key):
+        entry = self._index.get(key)
+        if entry is None:
+            return None
+        offset, length = entry
+        decompressor = zlib.decompressobj(zdict=self._zdict) if self._zdict else zlib.decompressobj()
+        return json.loads(decompressor.decompress(self._data[offset:offset + length]).decode("utf-8"))
+
+    def get(self, project_power_mw, project_capacity_mwh, max_device_sets=100):
+        """网格内的输入返回总体最优方案，否则返回 None"""
+        return self._load(_solution_table_key(project_power_mw, project_capacity_mwh, max_device_sets))
+
+    def lookup(self, result_key):
+        """按 ConfiguratorEngine 的结果缓存键查表：仅总体方案、且设备规格指纹与搜索引擎一致时可能命中"""
+        if len(result_key) != 6:
+            return None  # 附带备选方案参数的键
+        fingerprint, target_dc_family, project_power_mw, project_capacity_mwh, max_device_sets, search_engine = result_key
+        if target_dc_family is not None or fingerprint != self.spec_fingerprint or search_engine != self.search_engine:
+            return None
+        return self._load((project_power_mw, project_capacity_mwh, max_device_sets))
+
+def load_solution_table(path):
+    """载入预计算答案表并挂接到默认引擎，返回该表；表与当前求解器或设备规格不一致时抛出 ValueError"""
+    table = SolutionTable(path)
+    default_engine().attach_solution_table(table)
+    return table
+
+def _system_hour_types(project_power_mw, project_capacity_mwh):
+    """calculate_project_duration_type 的 NumPy 批量版本：由功率、容量数组得到各项目的系统时长类型数组"""
+    positive = project_power_mw > EPSILON
+    duration_hours = np.divide(project_capacity_mwh, project_power_mw, out=np.zeros_like(project_capacity_mwh), where=positive)
+    hour_types = np.select([duration_hours <= 1.5 + EPSILON, duration_hours <= 3.0 + EPSILON, duration_hours <= 5.0 + EPSILON, duration_hours <= 7.0 + EPSILON],
+                           [1, 2, 4, 6], default=8)
+    return np.where(positive, hour_types, 8)
+
+def _solve_many_worker(catalogue_snapshot, points, family, search_engine):
+    """solve_many 的工作进程入口：载入单元块目录后依次求解一批 (功率, 容量, 设备套数上限)，返回 [(方案, 用时秒), ...]"""
+    engine = default_engine()
+    engine.block_catalogue.update(catalogue_snapshot)
+    results = []
+    for project_power_mw, project_capacity_mwh, max_device_sets in points:
+        start = time.perf_counter()
+        solution = engine.solve(project_power_mw, project_capacity_mwh, family, max_device_sets, search_engine)
+        results.append((solution, time.perf_counter() - start))
+    return results
+
+def solve_many(projects, family=None, max_device_sets=100, search_engine=None, workers=None):
+    """批量求解多个项目（见 ConfiguratorEngine.solve_many），使用默认引擎"""
+    return default_engine().solve_many(projects, family, max_device_sets, search_engine, workers)
+
+def sweep_solutions(project_powers_mw, column_values, max_device_sets=100, search_engine=None, by_duration=False):
+    """功率 × 容量（或系统时长）网格的参数扫描（见 ConfiguratorEngine.sweep），使用默认引擎"""
+    return default_engine().sweep(project_powers_mw, column_values, max_device_sets, search_engine, by_duration)
+
+def lookup_overall_solution(project_power_mw, project_capacity_mwh, max_device_sets=100, search_engine=None):
+    """默认引擎中已有的总体最优方案（答案表或结果缓存），没有时返回 None；浏览器端并行求解两个家族前先调用"""
+    return default_engine().lookup_overall(project_power_mw, project_capacity_mwh, max_device_sets, search_engine)
+
 def calculate_minimum_device_sets(project_power_mw, project_capacity_mwh):
     """计算满足项目需求的最小设备套数"""
-    if project_power_mw <= EPSILON or project_capacity_mwh <= EPSILON:
-        return 0
-    
-    # 获取最大功率的单个设备块来计算最少需要的套数
-    max_single_block_power = max(PCS_SPECS[pcs]["power_mw"] for pcs in PCS_SPECS)
-    min_sets_for_power = math.ceil(project_power_mw / max_single_block_power)
-    
-    # 获取最大容量的单个设备块来计算最少需要的套数
-    max_single_block_capacity = max(DC_CONTAINER_SPECS[dc]["capacity_mwh"] for dc in DC_CONTAINER_SPECS)
-    duration_hours, system_hour_type = calculate_project_duration_type(project_power_mw, project_capacity_mwh)
-    max_capacity_per_block = max_single_block_capacity * system_hour_type
-    min_sets_for_capacity = math.ceil(project_capacity_mwh / max_capacity_per_block)
-    
-    return max(min_sets_for_power, min_sets_for_capacity, 1)
+    return default_engine().minimum_device_sets(project_power_mw, project_capacity_mwh)
 
 def calculate_area_small_project(system_type, n_sets, system_duration_h):
     """
@@ -0,0 +1,107 @@
+"""
+组合搜索内存分配基准（tracemalloc）
+
+用法:
+    python bench_allocations.py [--engine exact] [--baseline 旧版all_sys.py路径]
+
+对每个算例统计单次求解期间 tracemalloc 跟踪到的峰值内存与求解结束后的驻留内存，
+并在求解前后各取一次快照，按 Snapshot.compare_to 的逐行统计汇总新增的内存块数与字节数
+（快照只含当时仍存活的内存块，求解期间分配后又释放的临时对象体现在峰值中）；
+指定 --baseline 时对同一组算例运行旧版模块并列出对比。
+"""
+import argparse
+import importlib.util
+import sys
+import time
+import tracemalloc
+
+BENCH_CASES = [
+    # (项目功率MW, 项目容量MWh, 产品族)
+    (12, 30, "5MW"),
+    (50, 100, "5MW"),
+    (50, 100, "7.5MW"),
+    (100, 400, "7.5MW"),
+    (200, 800, "5MW"),
+]
+
+
+def load_module(path, name):
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+# 快照中排除 tracemalloc 自身的分配
+SNAPSHOT_FILTERS = [tracemalloc.Filter(False, tracemalloc.__file__)]
+
+
+def allocation_diff(before, after):
+    """两次快照间按分配位置（文件:行）汇总的新增内存块数与 KiB（只计各位置的净增量）"""
+    stats = after.filter_traces(SNAPSHOT_FILTERS).compare_to(before.filter_traces(SNAPSHOT_FILTERS), "lineno")
+    blocks = sum(stat.count_diff for stat in stats if stat.count_diff > 0)
+    size = sum(stat.size_diff for stat in stats if stat.size_diff > 0)
+    return blocks, size / 1024
+
+
+def measure(solve):
+    """
+    返回 (峰值KiB, 求解结束后仍驻留的KiB, 新增内存块数, 新增KiB, 耗时s)；先预热一次，排除单元块目录等缓存的首次分配
+    （solve 不得缓存求解结果，否则计时的那次求解直接命中缓存，见 run）
+    """
+    solve()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    tracemalloc.reset_peak()
+    base, _ = tracemalloc.get_traced_memory()
+    start = time.perf_counter()
+    solve()
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    blocks, allocated = allocation_diff(before, after)
+    return (peak - base) / 1024, (current - base) / 1024, blocks, allocated, elapsed
+
+
+def run(module, engine):
+    # 有求解引擎的模块用不缓存求解结果的引擎（保留单元块目录及预处理缓存），旧版模块直接调用模块函数
+    if hasattr(module, "ConfiguratorEngine"):
+        solve_family = module.ConfiguratorEngine(result_cache_size=0).solve_family
+    else:
+        solve_family = module.get_optimal_solution_for_dc_family
+    results = []
+    for power, capacity, family in BENCH_CASES:
+        if engine is None:
+            solve = lambda: solve_family(family, power, capacity)
+        else:
+            solve = lambda: solve_family(family, power, capacity, search_engine=engine)
+        results.append(measure(solve))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--engine", default=None, help="组合搜索引擎（默认使用模块默认引擎）")
+    parser.add_argument("--baseline", default=None, help="旧版 all_sys.py 路径，用于对比")
+    args = parser.parse_args()
+
+    current = run(load_module("all_sys.py", "all_sys"), args.engine)
+    baseline = run(load_module(args.baseline, "baseline_all_sys"), None) if args.baseline else None
+
+    header = f"{'算例':<22}{'峰值KiB':>12}{'驻留KiB':>12}{'新增块数':>10}{'新增KiB':>12}{'耗时s':>10}"
+    if baseline:
+        header += f"{'旧版峰值KiB':>14}{'旧版驻留KiB':>14}{'旧版新增块数':>14}{'旧版新增KiB':>14}{'旧版耗时s':>12}"
+    print(header)
+    for i, (power, capacity, family) in enumerate(BENCH_CASES):
+        peak, retained, blocks, allocated, elapsed = current[i]
+        line = f"{f'{power}MW/{capacity}MWh {family}':<22}{peak:>12.1f}{retained:>12.1f}{blocks:>10d}{allocated:>12.1f}{elapsed:>10.3f}"
+        if baseline:
+            b_peak, b_retained, b_blocks, b_allocated, b_elapsed = baseline[i]
+            line += f"{b_peak:>14.1f}{b_retained:>14.1f}{b_blocks:>14d}{b_allocated:>14.1f}{b_elapsed:>12.3f}"
+        print(line)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
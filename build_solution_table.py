@@ -0,0 +1,55 @@
+"""
+预计算答案表生成工具
+
+用法:
+    python build_solution_table.py [-o solution_table.bin] [--power-min 1] [--power-max 300] [--power-step 1]
+                                   [--durations 2,4,6] [--max-device-sets 100] [--workers 2]
+
+对 功率 × 时长 × 设备套数上限 网格中的每个输入（容量 = 功率 × 时长）求解总体最优方案，
+写入 all_sys.load_solution_table 可载入的答案表文件；放在站点根目录时浏览器端 Worker 会自动取回使用。
+设备规格或求解逻辑变化后须重新生成（旧表载入时会被拒绝）。
+"""
+import argparse
+import os
+import sys
+import time
+
+import all_sys
+
+
+def parse_numbers(text, cast=float):
+    return [cast(item) for item in text.split(",") if item.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-o", "--output", default="solution_table.bin", help="输出文件路径")
+    parser.add_argument("--power-min", type=float, default=1, help="最小项目功率 MW")
+    parser.add_argument("--power-max", type=float, default=300, help="最大项目功率 MW")
+    parser.add_argument("--power-step", type=float, default=1, help="功率步长 MW")
+    parser.add_argument("--durations", default="2,4,6", help="系统时长 h（逗号分隔）")
+    parser.add_argument("--max-device-sets", default="100", help="设备套数上限（逗号分隔）")
+    parser.add_argument("--search-engine", default=None, help="组合搜索引擎（默认使用模块默认引擎）")
+    parser.add_argument("--workers", type=int, default=None, help="并行求解两个DC家族的工作进程数")
+    args = parser.parse_args()
+
+    steps = int(round((args.power_max - args.power_min) / args.power_step))
+    powers = [round(args.power_min + i * args.power_step, 6) for i in range(steps + 1)]
+    grid = [(power, round(power * duration, 6), max_device_sets)
+            for power in powers
+            for duration in parse_numbers(args.durations)
+            for max_device_sets in parse_numbers(args.max_device_sets, int)]
+
+    start = time.perf_counter()
+
+    def progress(done, total):
+        if done % 50 == 0 or done == total:
+            print(f"{done}/{total}  {time.perf_counter() - start:.1f}s", file=sys.stderr)
+
+    count = all_sys.build_solution_table(args.output, grid, args.search_engine, args.workers, progress)
+    print(f"已写入 {args.output}: {count} 条，{os.path.getsize(args.output) / 1024:.1f} KiB，用时 {time.perf_counter() - start:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
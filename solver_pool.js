@@ -0,0 +1,147 @@
+/**
+ * 配置计算 Web Worker 池
+ *
+ * 每个 Worker 各自加载一份 Pyodide 与 all_sys.py（见 solver_worker.js）。
+ * 总体最优方案求解时，5MW 与 7.5MW 两个DC家族分别交给不同的 Worker 并行计算，
+ * 再由其中一个 Worker 调用 combine_dc_family_solutions 合并结果；
+ * 与主线程直接调用 get_overall_optimal_solution 的结果一致。
+ *
+ * cancel() 放弃所有进行中的求解（例如用户修改了输入）：对应的 Promise 立即以 error.cancelled = true 拒绝。
+ * 页面为 crossOriginIsolated 时每个 Worker 带一块共享中断缓冲区，进行中的 Python 搜索在几毫秒内停止；
+ * 否则（如静态托管无法设置 COOP/COEP 响应头）没有中断缓冲区，cancel() 终止忙碌的 Worker 并在原序号上重建一个，
+ * 新 Worker 重新加载 Pyodide 与计算脚本（数秒），其后的请求排在加载之后执行。
+ */
+
+class SolverPool {
+    /**
+     * @param {number} size - Worker 数量（默认2，即每个DC家族一个）
+     * @param {string} workerUrl - Worker 脚本路径
+     */
+    constructor(size = 2, workerUrl = "./solver_worker.js") {
+        this.workerUrl = workerUrl;
+        this.workers = [];
+        this.interruptBuffers = [];
+        this.pending = new Map();
+        this.nextId = 1;
+        const canInterrupt = typeof SharedArrayBuffer !== "undefined" && self.crossOriginIsolated === true;
+        for (let i = 0; i < Math.max(1, size); i++) {
+            this.workers.push(this._spawnWorker());
+            // [0]: Pyodide 中断标志，[1]: 取消代数
+            this.interruptBuffers.push(canInterrupt ? new Int32Array(new SharedArrayBuffer(8)) : null);
+        }
+    }
+
+    _spawnWorker() {
+        const worker = new Worker(this.workerUrl);
+        worker.onmessage = (event) => this._onMessage(event.data);
+        worker.onerror = (event) => this._onWorkerError(worker, event);
+        return worker;
+    }
+
+    /**
+     * 终止序号为 index 的 Worker 并在原位重建（无中断缓冲区时的取消方式）。
+     * 旧 Worker 上未完成的求解请求以 error.cancelled = true 拒绝；未完成的引擎加载请求改由新 Worker 的加载结果兑现
+     */
+    _respawnWorker(index) {
+        const oldWorker = this.workers[index];
+        oldWorker.terminate();
+        const waitingInit = [];
+        for (const [id, request] of this.pending) {
+            if (request.worker !== oldWorker) continue;
+            this.pending.delete(id);
+            if (request.type === "init") {
+                waitingInit.push(request);
+                continue;
+            }
+            const error = new Error("求解已取消");
+            error.cancelled = true;
+            request.reject(error);
+        }
+        this.workers[index] = this._spawnWorker();
+        const ready = this._request(index, "init", { interruptBuffer: null, workerIndex: index });
+        for (const request of waitingInit) ready.then(request.resolve, request.reject);
+        if (!waitingInit.length) ready.catch((error) => console.warn("计算 Worker 重建后初始化失败:", error));
+    }
+
+    _request(workerIndex, type, args) {
+        const index = workerIndex % this.workers.length;
+        const worker = this.workers[index];
+        const buffer = this.interruptBuffers[index];
+        const epoch = buffer ? Atomics.load(buffer, 1) : 0;
+        const id = this.nextId++;
+        return new Promise((resolve, reject) => {
+            this.pending.set(id, { resolve, reject, worker, index, type });
+            worker.postMessage({ id, type, args, epoch });
+        });
+    }
+
+    /**
+     * 在所有 Worker 中加载计算引擎
+     */
+    init() {
+        return Promise.all(this.workers.map((_, i) => this._request(i, "init", { interruptBuffer: this.interruptBuffers[i], workerIndex: i })));
+    }
+
+    /**
+     * 放弃所有进行中及排队的求解请求（引擎加载请求除外）。
+     * 只向有未完成求解请求的 Worker 发出中断：空闲 Worker 的中断标志若被置位，会打断其下一次执行的 Python 代码；
+     * 没有中断缓冲区的忙碌 Worker 无法打断，直接终止并重建
+     */
+    cancel() {
+        const busy = new Set();
+        for (const request of this.pending.values()) {
+            if (request.type !== "init") busy.add(request.index);
+        }
+        for (const index of busy) {
+            const buffer = this.interruptBuffers[index];
+            if (!buffer) {
+                this._respawnWorker(index);
+                continue;
+            }
+            Atomics.add(buffer, 1, 1);
+            Atomics.store(buffer, 0, 2); // SIGINT
+        }
+        for (const [id, request] of this.pending) {
+            if (request.type === "init") continue;
+            this.pending.delete(id);
+            const error = new Error("求解已取消");
+            error.cancelled = true;
+            request.reject(error);
+        }
+    }
+
+    /**
+     * 求解单个DC家族的最优方案；alternatives 为备选方案参数（数字 K、"pareto" 或 {top_k, pareto}），结果附加 alternatives
+     */
+    solveFamily(family, projectPowerMw, projectCapacityMwh, maxDeviceSets = 100, alternatives = null) {
+        const workerIndex = family === "7.5MW" ? 1 : 0;
+        return this._request(workerIndex, "solve_family", { family, projectPowerMw, projectCapacityMwh, maxDeviceSets, alternatives });
+    }
+
+    /**
+     * 求解总体最优方案；多于一个 Worker 时先查预计算答案表/结果缓存（不含备选方案），未命中再两个DC家族并行求解
+     */
+    async solveOverall(projectPowerMw, projectCapacityMwh, maxDeviceSets = 100, alternatives = null) {
+        if (this.workers.length < 2) {
+            return this._request(0, "solve_overall", { projectPowerMw, projectCapacityMwh, maxDeviceSets, alternatives });
+        }
+        if (!alternatives) {
+            const known = await this._request(0, "lookup_overall", { projectPowerMw, projectCapacityMwh, maxDeviceSets });
+            if (known) return known;
+        }
+        const [solution5mw, solution75mw] = await Promise.all([
+            this.solveFamily("5MW", projectPowerMw, projectCapacityMwh, maxDeviceSets, alternatives),
+            this.solveFamily("7.5MW", projectPowerMw, projectCapacityMwh, maxDeviceSets, alternatives),
+        ]);
+        return this._request(0, "combine", { projectPowerMw, projectCapacityMwh, solution5mw, solution75mw });
+    }
+
+    terminate() {
+        for (const worker of this.workers) worker.terminate();
+        for (const request of this.pending.values()) request.reject(new Error("计算 Worker 已终止"));
+        this.pending.clear();
+        this.workers = [];
+    }
+}
+
+self.SolverPool = SolverPool;
@@ -0,0 +1,217 @@
+/**
+ * 配置计算 Web Worker
+ *
+ * 在独立线程中加载 Pyodide 与 all_sys.py，按消息执行求解，避免长时间计算阻塞页面主线程。
+ * 请求消息: { id, type, args, epoch }，type 取值:
+ *   - "init":          加载 Pyodide、numpy 与计算脚本；args.interruptBuffer 为可选的共享中断缓冲区（见下），
+ *                      args.workerIndex 为 Worker 序号（区分各 Worker 的持久化结果缓存）
+ *   - "solve_family":  args = { family, projectPowerMw, projectCapacityMwh, maxDeviceSets }
+ *   - "solve_overall": args = { projectPowerMw, projectCapacityMwh, maxDeviceSets }
+ *   - "combine":       args = { projectPowerMw, projectCapacityMwh, solution5mw, solution75mw }
+ *   - "lookup_overall": args = { projectPowerMw, projectCapacityMwh, maxDeviceSets }，只查答案表/结果缓存，未命中时 result 为 null
+ * 应答消息: { id, ok: true, result } 或 { id, ok: false, error, cancelled }；result 为普通 JS 对象（可结构化克隆）。
+ *
+ * 取消：interruptBuffer 是 SharedArrayBuffer 上的 Int32Array，[0] 为 Pyodide 中断标志，[1] 为取消代数。
+ * 主线程取消时先把 [1] 加一再向 [0] 写入 2：正在运行的求解在下一个搜索检查点抛出 SolveCancelled，
+ * 请求的 epoch 小于当前取消代数的排队请求直接跳过。init 执行 Python 代码前后都清除中断标志，
+ * 以免加载期间到达的取消（或上一次取消残留的标志）打断持久化缓存/答案表的载入。
+ *
+ * 持久化结果缓存：每个 Worker 把 IDBFS 挂载到 /solver_cache_<序号>（IndexedDB 按挂载点区分，
+ * 各 Worker 互不覆盖），由 all_sys.py 的 PersistentResultCache 读写其中的 sqlite 文件；
+ * 求解完成后延时把文件同步回 IndexedDB，页面重新加载后同样的输入直接命中缓存。
+ * 浏览器不支持 IndexedDB 或 sqlite3 包加载失败时不启用，求解不受影响。
+ *
+ * 预计算答案表：站点根目录存在 solution_table.bin（build_solution_table.py 生成）时，
+ * init 时取回并载入，网格内的输入直接查表；文件不存在或与当前规格不一致时忽略。
+ */
+
+importScripts("https://cdn.jsdelivr.net/pyodide/v0.25.1/full/pyodide.js");
+
+let pyodideReady = null;
+let interruptBuffer = null;
+let cancelToken = null;
+let resultCacheDir = null;
+let resultCacheSyncTimer = null;
+const RESULT_CACHE_SYNC_DELAY_MS = 1000;
+const SOLUTION_TABLE_URL = "./solution_table.bin";
+const SOLUTION_TABLE_PATH = "/solution_table.bin";
+let solutionTableLoaded = false;
+
+async function initPyodide() {
+    const pyodide = await loadPyodide();
+    await pyodide.loadPackage(["micropip", "numpy"]);
+    const pythonScriptResponse = await fetch("./all_sys.py");
+    if (!pythonScriptResponse.ok) {
+        throw new Error(`无法加载Python脚本: ${pythonScriptResponse.statusText}`);
+    }
+    pyodide.runPython(await pythonScriptResponse.text());
+    return pyodide;
+}
+
+function syncFs(pyodide, populate) {
+    return new Promise((resolve, reject) => pyodide.FS.syncfs(populate, (error) => (error ? reject(error) : resolve())));
+}
+
+/**
+ * 挂载 IDBFS 并为默认引擎挂接持久化结果缓存；失败时仅在控制台提示
+ */
+async function enableResultCache(pyodide, workerIndex) {
+    try {
+        await pyodide.loadPackage("sqlite3");
+        const dir = `/solver_cache_${workerIndex}`;
+        pyodide.FS.mkdirTree(dir);
+        pyodide.FS.mount(pyodide.FS.filesystems.IDBFS, {}, dir);
+        await syncFs(pyodide, true);
+        pyodide.runPython(`enable_persistent_result_cache("${dir}/results.sqlite3")`);
+        resultCacheDir = dir;
+    } catch (error) {
+        console.warn("持久化结果缓存未启用:", error);
+    }
+}
+
+/**
+ * 取回并载入预计算答案表；文件不存在或无法载入时仅在控制台提示
+ */
+async function enableSolutionTable(pyodide) {
+    try {
+        const response = await fetch(SOLUTION_TABLE_URL);
+        if (!response.ok) return;
+        pyodide.FS.writeFile(SOLUTION_TABLE_PATH, new Uint8Array(await response.arrayBuffer()));
+        pyodide.runPython(`load_solution_table("${SOLUTION_TABLE_PATH}")`);
+        solutionTableLoaded = true;
+    } catch (error) {
+        console.warn("预计算答案表未载入:", error);
+    }
+}
+
+/**
+ * 求解后延时把缓存文件写回 IndexedDB（连续求解时合并为一次同步）
+ */
+function scheduleResultCacheSync(pyodide) {
+    if (!resultCacheDir) return;
+    clearTimeout(resultCacheSyncTimer);
+    resultCacheSyncTimer = setTimeout(() => {
+        syncFs(pyodide, false).catch((error) => console.warn("结果缓存同步失败:", error));
+    }, RESULT_CACHE_SYNC_DELAY_MS);
+}
+
+function cancelledError() {
+    const error = new Error("求解已取消");
+    error.cancelled = true;
+    return error;
+}
+
+/**
+ * 处理请求前检查其是否已被取消，并清除上一次残留的中断标志
+ */
+function clearInterrupt() {
+    if (interruptBuffer) Atomics.store(interruptBuffer, 0, 0);
+}
+
+function beginSolve(epoch) {
+    if (!interruptBuffer) return;
+    const isStale = () => epoch < Atomics.load(interruptBuffer, 1);
+    if (isStale()) throw cancelledError();
+    Atomics.store(interruptBuffer, 0, 0);
+    // 清除标志期间主线程可能刚好发出取消：再检查一次
+    if (isStale()) throw cancelledError();
+}
+
+/**
+ * 将 Python 返回值转换为普通 JS 对象并释放代理
+ */
+function toPlain(pyodide, value) {
+    if (value instanceof pyodide.ffi.PyProxy) {
+        try {
+            return value.toJs({ dict_converter: Object.fromEntries, create_pyproxies: false });
+        } finally {
+            value.destroy();
+        }
+    }
+    return value;
+}
+
+async function handleRequest(type, args, epoch) {
+    if (!pyodideReady) {
+        pyodideReady = initPyodide();
+    }
+    const pyodide = await pyodideReady;
+    if (type === "init") {
+        if (args.interruptBuffer && !interruptBuffer) {
+            interruptBuffer = args.interruptBuffer;
+            clearInterrupt();
+            pyodide.setInterruptBuffer(interruptBuffer);
+            cancelToken = pyodide.runPython("PyodideInterruptToken()");
+        }
+        try {
+            if (!resultCacheDir) {
+                clearInterrupt();
+                await enableResultCache(pyodide, args.workerIndex || 0);
+            }
+            if (!solutionTableLoaded) {
+                clearInterrupt();
+                await enableSolutionTable(pyodide);
+            }
+        } finally {
+            clearInterrupt();
+        }
+        return true;
+    }
+    beginSolve(epoch);
+    // kwargs 不为空时按关键字参数调用（求解函数传入取消令牌 cancel_token）
+    const call = (name, params, kwargs = null) => {
+        const fn = pyodide.globals.get(name);
+        try {
+            return toPlain(pyodide, kwargs ? fn.callKwargs(...params, kwargs) : fn(...params));
+        } catch (error) {
+            if (error && (error.type === "SolveCancelled" || error.type === "KeyboardInterrupt")) throw cancelledError();
+            throw error;
+        } finally {
+            fn.destroy();
+        }
+    };
+    const cancelKwargs = cancelToken ? { cancel_token: cancelToken } : null;
+    // 备选方案参数（数字、"pareto" 或 {top_k, pareto}）：对象需转换为 Python 字典，调用后释放
+    const alternatives = args.alternatives && typeof args.alternatives === "object" ? pyodide.toPy(args.alternatives) : args.alternatives;
+    const solveKwargs = alternatives ? { ...cancelKwargs, alternatives } : cancelKwargs;
+    switch (type) {
+        case "solve_family":
+            try {
+                return call("get_optimal_solution_for_dc_family", [args.family, args.projectPowerMw, args.projectCapacityMwh, args.maxDeviceSets], solveKwargs);
+            } finally {
+                if (alternatives instanceof pyodide.ffi.PyProxy) alternatives.destroy();
+                scheduleResultCacheSync(pyodide);
+            }
+        case "solve_overall":
+            try {
+                return call("get_overall_optimal_solution", [args.projectPowerMw, args.projectCapacityMwh, args.maxDeviceSets], solveKwargs);
+            } finally {
+                if (alternatives instanceof pyodide.ffi.PyProxy) alternatives.destroy();
+                scheduleResultCacheSync(pyodide);
+            }
+        case "lookup_overall":
+            return call("lookup_overall_solution", [args.projectPowerMw, args.projectCapacityMwh, args.maxDeviceSets]) ?? null;
+        case "combine": {
+            const solution5mw = pyodide.toPy(args.solution5mw);
+            const solution75mw = pyodide.toPy(args.solution75mw);
+            try {
+                return call("combine_dc_family_solutions", [args.projectPowerMw, args.projectCapacityMwh, solution5mw, solution75mw]);
+            } finally {
+                solution5mw.destroy();
+                solution75mw.destroy();
+            }
+        }
+        default:
+            throw new Error(`未知的请求类型: ${type}`);
+    }
+}
+
+self.onmessage = async (event) => {
+    const { id, type, args, epoch } = event.data;
+    try {
+        const result = await handleRequest(type, args || {}, epoch || 0);
+        self.postMessage({ id, ok: true, result });
+    } catch (error) {
+        self.postMessage({ id, ok: false, error: error && error.message ? error.message : String(error), cancelled: !!(error && error.cancelled) });
+    }
+};
@@ -0,0 +1,435 @@
+"""
+all_sys.py 的回归测试：各组合搜索引擎与原 S1/S2/S3 三重循环的逐点穷举结果一致，答案表与持久化结果缓存可完整往返。
+
+运行: python -m pytest -q test_all_sys.py
+"""
+import json
+import math
+from itertools import combinations
+
+import pytest
+
+import all_sys
+
+INF = float("inf")
+
+# (项目功率MW, 项目容量MWh, 5MW家族 (成本, 功率, 容量, 电池舱数), 7.5MW家族 (...), 总体成本, 总体选中家族)
+# 期望值由原模块（S1/S2/S3 逐点穷举及原当前最优更新规则）求得
+EXPECTED_GRID = [
+    (2.5, 10, (483.75, 5.0, 10.0, 2), (436.85, 2.5, 10.03, 2), 436.85, "7.5MW"),
+    (5, 20, (913.75, 5.0, 20.0, 4), (873.63, 5.0, 20.058, 3), 873.63, "7.5MW"),
+    (6.3, 12.6, (788.36, 10.0, 12.958, 3), (701.36, 7.5, 13.372, 2), 701.36, "7.5MW"),
+    (3.3, 13.1, (627.54, 5.0, 13.344, 3), (599.5, 5.0, 13.372, 2), 599.5, "7.5MW"),
+    (10, 40, (1827.5, 10.0, 40.0, 8), (1747.26, 10.0, 40.116, 6), 1747.26, "7.5MW"),
+    (12, 48, (2228.26, 15.0, 48.07, 11), (2115.6, 12.5, 48.475, 7), 2115.6, "7.5MW"),
+    (7.5, 30, (1397.5, 10.0, 30.0, 6), (1310.56, 7.5, 30.09, 4), 1310.56, "7.5MW"),
+    (15, 37.5, (2168.72, 20.0, 37.524, 8), (1960.15, 20.0, 37.612, 5), 1960.15, "7.5MW"),
+    (4, 24, (INF, 0, 0, INF), (1045.05, 5.0, 24.239, 4), 1045.05, "7.5MW"),
+]
+
+ENGINES = sorted(all_sys.SEARCH_ENGINES)
+
+
+@pytest.fixture
+def engine():
+    """不缓存求解结果的引擎，每次调用都实际搜索"""
+    return all_sys.ConfiguratorEngine(result_cache_size=0)
+
+
+def _family_summary(solution):
+    return (solution["cost"], solution["power"], solution["capacity"], solution.get("total_dc_containers", INF))
+
+
+def _reference_best(project_power_mw, project_capacity_mwh, available_ess_blocks, system_hour_type, unit_price, max_device_sets=100):
+    """
+    原 find_best_combination_of_ess_blocks 的 S1/S2/S3 三重循环逐点穷举（不设 s3_max_sets 上限），独立于各搜索引擎：
+    返回 (成本, 额定功率, 直流容量, 电池舱总数, [(块数, 块描述), ...])，无可行组合时返回 None
+    """
+    epsilon = all_sys.EPSILON
+    tie_epsilon = 0.01 * 100 * unit_price
+    loop_end = min(math.ceil(project_power_mw / min(b["pcs_power_mw"] for b in available_ess_blocks)) + 4, max_device_sets)
+    reduced = [any(all_sys.get_dc_spec_by_name(d["name"])["reduced_clusters"] > 0 for d in b["dc_containers_detail_list"]) for b in available_ess_blocks]
+    best = None
+
+    def update(cost, power, capacity, config):
+        nonlocal best
+        total_dc_containers = all_sys.get_total_physical_dc_containers_count(config)
+        if best is not None:
+            best_cost, best_power, _, best_dc_containers, _ = best
+            if cost < best_cost - tie_epsilon: pass
+            elif cost > best_cost + tie_epsilon: return
+            elif total_dc_containers < best_dc_containers: pass
+            elif total_dc_containers > best_dc_containers: return
+            elif cost < best_cost - epsilon: pass
+            elif not (abs(cost - best_cost) < epsilon and power < best_power - epsilon): return
+        best = (cost, power, capacity, total_dc_containers, config)
+
+    def check_power(indices, config, power, capacity, cost):
+        config = sorted(config, key=lambda x: x[1]["block_description"])
+        if any(reduced[i] for i in indices):
+            actual_power = 0
+            for n, block in config:
+                actual_power += n * min(block["pcs_power_mw"], block["block_dc_capacity_mwh"] / system_hour_type)
+            if round(actual_power, 3) < project_power_mw - epsilon: return
+        elif power < project_power_mw - epsilon: return
+        update(cost, power, capacity, config)
+
+    blocks = available_ess_blocks
+    for total in range(1, loop_end + 1):
+        for i, b1 in enumerate(blocks):  # Scenario 1
+            capacity = round(total * b1["block_dc_capacity_mwh"], 3)
+            if capacity >= project_capacity_mwh - epsilon:
+                check_power((i,), [(total, b1)], round(total * b1["pcs_power_mw"], 3), capacity,
+                            round(total * b1["block_equivalent_capacity_mwh"] * 100 * unit_price, 2))
+        for i, j in combinations(range(len(blocks)), 2):  # Scenario 2
+            b1, b2 = blocks[i], blocks[j]
+            for n1 in range(1, total):
+                n2 = total - n1
+                capacity = round(n1 * b1["block_dc_capacity_mwh"] + n2 * b2["block_dc_capacity_mwh"], 3)
+                if capacity >= project_capacity_mwh - epsilon:
+                    check_power((i, j), [(n1, b1), (n2, b2)], round(n1 * b1["pcs_power_mw"] + n2 * b2["pcs_power_mw"], 3), capacity,
+                                round((n1 * b1["block_equivalent_capacity_mwh"] + n2 * b2["block_equivalent_capacity_mwh"]) * 100 * unit_price, 2))
+        for i, j, k in combinations(range(len(blocks)), 3):  # Scenario 3（容量按未取整值检查）
+            b1, b2, b3 = blocks[i], blocks[j], blocks[k]
+            if len({b1["block_description"], b2["block_description"], b3["block_description"]}) < 3: continue
+            for n1 in range(1, total - 1):
+                for n2 in range(1, total - n1):
+                    n3 = total - n1 - n2
+                    capacity = n1 * b1["block_dc_capacity_mwh"] + n2 * b2["block_dc_capacity_mwh"] + n3 * b3["block_dc_capacity_mwh"]
+                    if capacity < project_capacity_mwh - epsilon: continue
+                    power = n1 * b1["pcs_power_mw"] + n2 * b2["pcs_power_mw"] + n3 * b3["pcs_power_mw"]
+                    equivalent = n1 * b1["block_equivalent_capacity_mwh"] + n2 * b2["block_equivalent_capacity_mwh"] + n3 * b3["block_equivalent_capacity_mwh"]
+                    check_power((i, j, k), [(n1, b1), (n2, b2), (n3, b3)], round(power, 3), round(capacity, 3), round(equivalent * 100 * unit_price, 2))
+    if best is None:
+        return None
+    cost, power, capacity, total_dc_containers, config = best
+    return cost, power, capacity, total_dc_containers, [(n, block["block_description"]) for n, block in config]
+
+
+def _choice_summary(solution):
+    if solution["cost"] == INF:
+        return None
+    blocks_config = solution["blocks_config"]
+    return (solution["cost"], solution["power"], solution["capacity"], all_sys.get_total_physical_dc_containers_count(blocks_config),
+            [(n, block["block_description"]) for n, block in blocks_config])
+
+
+# (项目功率MW, 项目容量MWh, DC家族, 参与比较的全局DC规格选择（None 为该家族的全部单规格及双规格选择）)
+REFERENCE_CASES = [
+    (6.3, 12.6, "7.5MW", None),
+    (12, 48, "5MW", None),
+    (12, 48, "7.5MW", None),
+    # 较大项目：总块数上限 44，只比较单规格选择以控制穷举耗时
+    (100, 400, "5MW", [["ST5015UX_5MW_0R"], ["ST5015UX_5MW_2R"], ["ST5015UX_5MW_4R"]]),
+    (100, 400, "7.5MW", [["ST7523UX_7_5MW_0R"], ["ST7523UX_7_5MW_2R"], ["ST7523UX_7_5MW_4R"], ["ST7523UX_7_5MW_6R"]]),
+    # 平衡阈值边界：电池舱更多、成本恰好低 0.41万元（= 平衡阈值）的候选 6175.34 不替换当前最优 6175.75
+    (35.146, 140.112, "7.5MW", [["ST7523UX_7_5MW_0R", "ST7523UX_7_5MW_2R"]]),
+]
+
+
+@pytest.mark.parametrize("power, capacity, family, dc_spec_choices", REFERENCE_CASES)
+def test_engines_match_brute_force_reference(engine, power, capacity, family, dc_spec_choices):
+    _, system_hour_type = all_sys.calculate_project_duration_type(power, capacity)
+    if dc_spec_choices is None:
+        names = [name for name, spec in all_sys.DC_CONTAINER_SPECS.items() if spec["family"] == family]
+        dc_spec_choices = [[name] for name in names] + [list(pair) for pair in combinations(names, 2)]
+    dc_choices = [(names, engine.ess_block_catalogue(names, system_hour_type, family)) for names in dc_spec_choices]
+    unit_price = all_sys.get_unit_price(system_hour_type, family)
+    expected = [_reference_best(power, capacity, blocks, system_hour_type, unit_price) for _, blocks in dc_choices]
+    for search_engine in ENGINES:
+        # 各家族求解所用的共享搜索（不按成本窗口剔除选择）及逐个选择单独求解
+        search = all_sys._DcChoicesSearch(power, capacity, dc_choices, system_hour_type, family, 100, search_engine, INF)
+        for _ in search.steps():
+            pass
+        assert [_choice_summary(solution) for solution in search.results()] == expected
+        for (_, blocks), expected_choice in zip(dc_choices, expected):
+            solution = all_sys.find_best_combination_of_ess_blocks(power, capacity, blocks, system_hour_type, family, search_engine=search_engine)
+            assert _choice_summary(solution) == expected_choice
+
+
+DUPLICATE_SPEC_CHOICES = [["ST5015UX_5MW_0R"], ["ST5015UX_5MW_1R"], ["ST5015UX_5MW_1R_B"],
+                          ["ST5015UX_5MW_0R", "ST5015UX_5MW_1R"], ["ST5015UX_5MW_0R", "ST5015UX_5MW_1R_B"],
+                          ["ST5015UX_5MW_1R", "ST5015UX_5MW_3R"], ["ST5015UX_5MW_1R_B", "ST5015UX_5MW_3R"]]
+
+
+@pytest.mark.parametrize("power, capacity", [(6.3, 12.6), (12, 48), (23, 46)])
+@pytest.mark.parametrize("with_duplicates_in_choice", [False, True])
+def test_collapsed_equivalent_blocks_match_uncollapsed(engine, monkeypatch, power, capacity, with_duplicates_in_choice):
+    """目录中含数值完全相同的单元块（同参数、不同名称的电池舱）时，按等价类合并搜索与不合并的结果相同"""
+    monkeypatch.setitem(all_sys.DC_CONTAINER_SPECS, "ST5015UX_5MW_1R_B",
+                        dict(all_sys.DC_CONTAINER_SPECS["ST5015UX_5MW_1R"], name_cn="5MWh标准电池舱(减1簇, 乙)"))
+    dc_spec_choices = DUPLICATE_SPEC_CHOICES + ([["ST5015UX_5MW_1R", "ST5015UX_5MW_1R_B"]] if with_duplicates_in_choice else [])
+    _, system_hour_type = all_sys.calculate_project_duration_type(power, capacity)
+    dc_choices = [(names, engine.ess_block_catalogue(names, system_hour_type, "5MW")) for names in dc_spec_choices]
+    unit_price = all_sys.get_unit_price(system_hour_type, "5MW")
+    ((_, (class_table, _, _, class_members)),) = all_sys._plan_shared_search([blocks for _, blocks in dc_choices], system_hour_type, unit_price)
+    # 同一选择内含同类的多个块时不合并
+    assert (class_members is None) == with_duplicates_in_choice
+    if not with_duplicates_in_choice:
+        assert len(class_table) < len({block["block_description"] for _, blocks in dc_choices for block in blocks})
+
+    def solve_choices():
+        results = {}
+        for search_engine in ENGINES:
+            search = all_sys._DcChoicesSearch(power, capacity, dc_choices, system_hour_type, "5MW", 100, search_engine, INF)
+            for _ in search.steps():
+                pass
+            results[search_engine] = [_choice_summary(solution) for solution in search.results()]
+        return results
+
+    collapsed = solve_choices()
+    monkeypatch.setattr(all_sys, "_collapse_equivalent_blocks", lambda table, block_masks, *_: (table, tuple(block_masks), None))
+    assert solve_choices() == collapsed
+    # 选用乙型电池舱的选择给出乙型单元块，与甲型选择的最优方案数值相同
+    expected = collapsed["exact"]
+    assert expected[1] is not None and expected[2][:4] == expected[1][:4]
+    assert all("乙" in description for _, description in expected[2][4])
+
+
+@pytest.mark.parametrize("system_hour_type", [2, 4, 6])
+def test_fixed_point_totals_match_float_rounding(engine, system_hour_type):
+    """定点累加的容量/实际功率与原浮点累加后 round(..., 3) 相同，含实际功率取整恰为 .5 kW 的组合（7.522MWh ÷ 4h = 1.8805MW）"""
+    names = [name for name, spec in all_sys.DC_CONTAINER_SPECS.items() if spec["family"] == "7.5MW"]
+    blocks = engine.ess_block_catalogue(names[:2], system_hour_type, "7.5MW")
+    table = all_sys.EssBlockTable(blocks, system_hour_type, all_sys.get_unit_price(system_hour_type, "7.5MW"))
+    ctx = all_sys._BlockSearchContext(0, 0, table, 1, 1)
+    ties = 0
+    for i, j in combinations(range(len(table)), 2):
+        for n1 in range(1, 12):
+            for n2 in range(0, 12):
+                combo = ((i, n1), (j, n2)) if n2 else ((i, n1),)
+                capacity = sum(n * table.capacity[k] for k, n in combo)
+                assert ctx.capacity_of(combo) == round(round(capacity, 3) * 1000)
+                actual_power = sum(n * table.actual_power[k] for k, n in sorted(combo, key=lambda x: table.description_rank[x[0]]))
+                ties += abs(actual_power * 1000 - math.floor(actual_power * 1000) - 0.5) < 1e-6
+                assert ctx.actual_power_of(combo) == round(round(actual_power, 3) * 1000)
+    assert ties > 0
+
+
+def test_tie_boundary_family_result(engine):
+    solution = engine.solve_family("7.5MW", 35.146, 140.112)
+    assert _family_summary(solution) == (6175.75, 37.5, 141.253, 19)
+
+
+@pytest.mark.parametrize("search_engine", ENGINES)
+@pytest.mark.parametrize("power, capacity, expected_5mw, expected_7_5mw, expected_cost, expected_family", EXPECTED_GRID)
+def test_engines_match_enumerate_grid(engine, search_engine, power, capacity, expected_5mw, expected_7_5mw, expected_cost, expected_family):
+    assert _family_summary(engine.solve_family("5MW", power, capacity, search_engine=search_engine)) == expected_5mw
+    assert _family_summary(engine.solve_family("7.5MW", power, capacity, search_engine=search_engine)) == expected_7_5mw
+    overall = engine.solve_overall(power, capacity, search_engine=search_engine)
+    assert overall["total_cost"] == expected_cost
+    assert overall["dc_family_technology"] == expected_family
+
+
+@pytest.mark.parametrize("search_engine", ENGINES)
+def test_incumbent_update_follows_original_order(engine, search_engine):
+    """原遍历中电池舱更少、成本差在 0.01MWh 等效容量以内的候选会替换当前最优：8265.27（28个电池舱），而非成本最低的 8265.52"""
+    solution = engine.solve_family("7.5MW", 47.236, 188.944, search_engine=search_engine)
+    assert _family_summary(solution) == (8265.27, 47.5, 189.717, 28)
+    assert [n for n, _ in solution["blocks_config"]] == [8, 1]
+
+
+@pytest.mark.parametrize("family, power, capacity", [("5MW", 5, 20), ("7.5MW", 15, 37.5)])
+def test_choices_skipped_by_bound_do_not_change_result(engine, monkeypatch, family, power, capacity):
+    """搜索中已求解完毕的选择剔除成本下界超出排序窗口的选择，结果与完整搜索所有选择相同"""
+    solution = engine.solve_family(family, power, capacity)
+    assert solution.pop("dc_choices_skipped_by_bound")
+    monkeypatch.setattr(all_sys._SharedCandidatePools, "exclude_above", lambda self, finished_cost: None)
+    unbounded = engine.solve_family(family, power, capacity)
+    assert unbounded.pop("dc_choices_skipped_by_bound") == []
+    assert solution == unbounded
+
+
+def test_dominated_candidate_can_still_replace_incumbent():
+    """
+    当前最优更新规则不具传递性：与更早候选完全相同（被支配）的候选仍可能替换其间更新过的当前最优，
+    预先剔除被支配的单元块会改变结果
+    """
+    def entry(total_dc_containers, cost, block_index):
+        return (total_dc_containers, cost, 5000, 1, 1, (block_index,), (1,), 0)
+
+    earlier, later = entry(10, 100.0, 0), entry(10, 100.0, 3)
+    stream = [earlier, entry(9, 100.9, 1), entry(12, 99.8, 2)]
+    pruned = all_sys._CandidatePool(cost_tie_epsilon=1.0)
+    for candidate in stream:
+        pruned.offer(candidate)
+    full = all_sys._CandidatePool(cost_tie_epsilon=1.0)
+    for candidate in stream + [later]:
+        full.offer(candidate)
+    assert pruned.best() == stream[-1]
+    assert full.best() == later
+
+
+@pytest.mark.parametrize("alternatives", [5, "pareto", {"top_k": 6, "pareto": True}])
+@pytest.mark.parametrize("power, capacity", [(6.3, 12.6), (12, 48)])
+def test_engines_match_enumerate_with_alternatives(engine, power, capacity, alternatives):
+    expected = engine.solve_overall(power, capacity, search_engine="enumerate", alternatives=alternatives)
+    assert engine.solve_overall(power, capacity, search_engine="exact", alternatives=alternatives) == expected
+
+
+def test_sweep_matches_per_cell_solve(engine):
+    powers, capacities = [5, 12], [20, 48]
+    sweep = engine.sweep(powers, capacities)
+    for i, power in enumerate(powers):
+        for j, capacity in enumerate(capacities):
+            overall = engine.solve(power, capacity)
+            assert sweep["min_device_sets"][i, j] == overall["min_device_sets"]
+            family = overall["dc_family_technology"]
+            if family not in sweep["families"]:  # 5MW/48MWh 为不支持的系统时长，无可行方案
+                assert (sweep["cost"][i, j], sweep["family_index"][i, j]) == (INF, -1)
+                continue
+            assert sweep["cost"][i, j] == overall["total_cost"]
+            assert (sweep["power"][i, j], sweep["capacity"][i, j]) == (overall["power"], overall["capacity"])
+            assert sweep["families"][sweep["family_index"][i, j]] == family
+            assert sweep["dc_count"][i, j] == engine.solve(power, capacity, family=family)["total_dc_containers"]
+
+
+def test_process_pool_matches_serial_after_spec_change(engine, monkeypatch):
+    """两个DC家族在进程池中并行求解的结果与串行相同；修改设备规格表后工作进程使用新的规格表"""
+    try:
+        serial = engine.solve_overall(12, 48, workers=1)
+        assert serial["dc_family_technology"] == "7.5MW"
+        assert engine.solve_overall(12, 48, workers=2) == serial
+        # 7.5MW 单价提高后总体方案改选 5MW 家族
+        monkeypatch.setitem(all_sys.UNIT_PRICE_TABLE[4], "7.5MW", 0.5)
+        serial = engine.solve_overall(12, 48, workers=1)
+        assert serial["dc_family_technology"] == "5MW"
+        assert engine.solve_overall(12, 48, workers=2) == serial
+    finally:
+        all_sys.shutdown_solver_executors()
+
+
+def test_result_cache_counts_hits_misses_and_evictions():
+    cached = all_sys.ConfiguratorEngine(result_cache_size=1)
+    first = cached.solve_family("5MW", 10, 40)
+    assert cached.solve_family("5MW", 10, 40) == first
+    assert cached.solve_family("5MW", 10 + 1e-12, 40) == first  # 相差不足 EPSILON 的输入共用缓存条目
+    assert (cached.counters["result_misses"], cached.counters["result_hits"], cached.counters["family_solves"]) == (1, 2, 1)
+    # 容量为1：新输入淘汰旧条目，再次求解旧输入重新计算
+    cached.solve_family("5MW", 12, 48)
+    cached.solve_family("5MW", 10, 40)
+    assert (cached.counters["result_misses"], cached.counters["result_hits"], cached.counters["result_evictions"]) == (3, 2, 2)
+    assert cached.counters["family_solves"] == 3
+    assert cached.stats()["result_entries"] == 1
+
+
+def test_result_cache_returns_defensive_copies():
+    cached = all_sys.ConfiguratorEngine(result_cache_size=4)
+    first = cached.solve_family("5MW", 10, 40)
+    expected = json.loads(json.dumps(first, ensure_ascii=False))
+    # 修改未命中时返回的方案及命中时返回的方案（含嵌套列表/字典）都不影响缓存
+    first["total_cost"] = -1
+    first["blocks_config"].clear()
+    hit = cached.solve_family("5MW", 10, 40)
+    assert json.loads(json.dumps(hit, ensure_ascii=False)) == expected
+    hit["pcs_config_summary"]["tampered"] = True
+    hit["block_details_for_display"].append("tampered")
+    again = cached.solve_family("5MW", 10, 40)
+    assert json.loads(json.dumps(again, ensure_ascii=False)) == expected
+    assert again is not hit
+    assert cached.counters["result_hits"] == 2
+
+
+def test_spec_change_clears_cached_results(monkeypatch):
+    cached = all_sys.ConfiguratorEngine(result_cache_size=4)
+    before = cached.solve_family("5MW", 10, 40)
+    assert cached.solve_family("5MW", 10, 40) == before
+    monkeypatch.setitem(all_sys.UNIT_PRICE_TABLE[4], "5MW", 0.5)
+    after = cached.solve_family("5MW", 10, 40)
+    assert after["unit_price"] == 0.5
+    assert after == all_sys.ConfiguratorEngine(result_cache_size=0).solve_family("5MW", 10, 40)
+    assert cached.counters["spec_invalidations"] == 1
+    assert (cached.counters["result_misses"], cached.counters["result_hits"], cached.counters["family_solves"]) == (2, 1, 2)
+    # 改回原单价后旧条目已被清空，需重新求解
+    monkeypatch.setitem(all_sys.UNIT_PRICE_TABLE[4], "5MW", before["unit_price"])
+    assert cached.solve_family("5MW", 10, 40) == before
+    assert (cached.counters["spec_invalidations"], cached.counters["family_solves"]) == (2, 3)
+
+
+def test_block_catalogue_round_trip(engine, monkeypatch):
+    """导出的单元块目录载入新引擎后直接命中，不再生成单元块，求解结果与现场生成目录时相同"""
+    catalogue_json = all_sys.export_ess_block_catalogue()
+    monkeypatch.setattr(all_sys, "_DEFAULT_ENGINE", all_sys.ConfiguratorEngine(result_cache_size=0))
+    assert all_sys.load_ess_block_catalogue(catalogue_json) == len(json.loads(catalogue_json)["entries"])
+    loaded = all_sys.default_engine()
+    for power, capacity in [(10, 20), (6.3, 12.6), (12, 48), (10, 60)]:
+        assert loaded.solve(power, capacity) == engine.solve(power, capacity)
+    assert loaded.counters["catalogue_misses"] == 0
+    assert loaded.counters["catalogue_hits"] > 0
+
+    # 设备规格变化后旧目录不可载入
+    monkeypatch.setitem(all_sys.DC_CONTAINER_SPECS, "ST5015UX_5MW_1R", dict(all_sys.DC_CONTAINER_SPECS["ST5015UX_5MW_1R"], capacity_mwh=4.6))
+    with pytest.raises(ValueError):
+        all_sys.load_ess_block_catalogue(catalogue_json)
+
+
+SOLVE_MANY_PROJECTS = [(12, 48), (10, 40), (6.3, 12.6), (2, 8), (12, 48), (5, 48), (10 + 1e-12, 40), (23, 46, 8), (10, 60), (1, 4)]
+
+
+@pytest.mark.parametrize("workers", [None, 2])
+@pytest.mark.parametrize("family", [None, "5MW"])
+def test_solve_many_matches_per_project_solve(engine, workers, family):
+    """批量求解（含不同系统时长、不同最优DC家族、无可行方案及重复的项目）与逐个求解的结果相同"""
+    try:
+        results = all_sys.ConfiguratorEngine().solve_many(SOLVE_MANY_PROJECTS, family=family, workers=workers)
+    finally:
+        all_sys.shutdown_solver_executors()
+    assert len(results) == len(SOLVE_MANY_PROJECTS)
+    assert [result.get("duplicate_of") for result in results] == [None] * 4 + [0, None, 1, None, None, None]
+    for project, result in zip(SOLVE_MANY_PROJECTS, results):
+        # 重复项目（含相差不足 EPSILON 的输入）沿用首次出现项目的方案
+        solved = SOLVE_MANY_PROJECTS[result.get("duplicate_of", SOLVE_MANY_PROJECTS.index(project))]
+        assert result["solution"] == engine.solve(*solved[:2], family, *solved[2:])
+        assert result["system_hour_type"] == all_sys.calculate_project_duration_type(*project[:2])[1]
+    # 重复项目的方案为独立副本
+    assert results[4]["solution"] is not results[0]["solution"]
+    if family is None:  # 2MW/8MWh 与 1MW/4MWh 总体选中 5MW 家族，其余有可行方案的项目选中 7.5MW 家族
+        assert {result["solution"]["dc_family_technology"] for result in results} >= {"5MW", "7.5MW"}
+
+
+def test_time_budget_returns_fallback_instead_of_nothing(engine):
+    solution = engine.solve_overall(60, 240, time_budget_ms=0)
+    assert math.isfinite(solution["total_cost"])
+    assert solution["optimality_proven"] is False
+    assert solution["budget_exhausted_without_solution"] is False
+    assert solution["lower_bound_cost"] <= solution["total_cost"]
+
+
+def _json_round_trip(solution):
+    return json.loads(json.dumps(solution, ensure_ascii=False))
+
+
+def test_solution_table_round_trip(tmp_path, engine):
+    grid = [(10, 40, 100), (7.5, 30, 100), (4, 24, 100)]
+    path = str(tmp_path / "solution_table.bin")
+    assert all_sys.build_solution_table(path, grid) == len(grid)
+    table = all_sys.SolutionTable(path)
+    assert len(table) == len(grid)
+    for power, capacity, max_device_sets in grid:
+        assert (power, capacity, max_device_sets) in table
+        assert table.get(power, capacity, max_device_sets) == _json_round_trip(engine.solve_overall(power, capacity, max_device_sets))
+    assert table.get(11, 44, 100) is None
+
+
+def test_persistent_result_cache_round_trip(tmp_path, engine):
+    path = str(tmp_path / "results.sqlite3")
+    cache = all_sys.PersistentResultCache(path)
+    engine.attach_persistent_cache(cache)
+    solution = engine.solve_overall(10, 40)
+    assert len(cache) == 3  # 总体方案及两个DC家族的方案各一条
+    engine.close()
+
+    # 另一个引擎挂接同一文件后直接命中，读回的方案与 JSON 往返后的原方案相同
+    reopened = all_sys.PersistentResultCache(path)
+    other = all_sys.ConfiguratorEngine(result_cache_size=0)
+    other.attach_persistent_cache(reopened)
+    assert other.lookup_overall(10, 40) == _json_round_trip(solution)
+    assert other.counters["persistent_hits"] == 1
+
+    # 损坏的条目按未命中处理
+    reopened.connection.execute("UPDATE solver_results SET solution = 'not json'")
+    assert other.lookup_overall(10, 40) is None
+    reopened.clear()
+    assert len(reopened) == 0
+    reopened.close()
+    assert len(reopened) == 0